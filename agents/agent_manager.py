@@ -1,14 +1,80 @@
-from agents.summarization import summarize_webpage
-from agents.lights import control_lights
+import os
+import importlib
+import threading
+from concurrent.futures import TimeoutError
+from dotenv import load_dotenv
+from agents.runtime import AgentRuntime, AgentSpec
 
-AGENT_FUNCTIONS = {
-    "summarization": summarize_webpage,
-    "turn_on_lights": control_lights,
-    "turn_off_lights": control_lights,
+load_dotenv()
+
+# Deadlines in seconds, the agent answers with a timeout message after them
+AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT", "10"))
+SUMMARY_TIMEOUT = float(os.getenv("SUMMARY_TIMEOUT", "120"))
+# Summaries running at once, more wait in the summarization queue
+SUMMARY_MAX_JOBS = int(os.getenv("SUMMARY_MAX_JOBS", "2"))
+# How long a turn waits for an agent before acknowledging and announcing the result later
+AGENT_ACK_AFTER = float(os.getenv("AGENT_ACK_AFTER", "1.5"))
+
+SUMMARIZATION = AgentSpec("summarization", "agents.summarization:summarize_webpage", SUMMARY_TIMEOUT, SUMMARY_MAX_JOBS,
+                          "summary", "Summarizing the page, I'll read it out when it's ready.")
+LIGHTS = AgentSpec("lights", "agents.lights:control_lights", AGENT_TIMEOUT, 4, "light control")
+
+# Intent -> agent, its module is imported on first use so LangGraph pipelines only compile when needed
+AGENT_REGISTRY = {
+    "summarization": SUMMARIZATION,
+    "turn_on_lights": LIGHTS,
+    "turn_off_lights": LIGHTS,
 }
 
-def execute_agent(intent: str, command: str) -> str:
-    """Calls the appropriate agent based on detected intent."""
+_agents = {}
+_agents_lock = threading.Lock()
+
+runtime = AgentRuntime()
+
+def get_agent(intent: str):
+    """Imports and returns the agent function for an intent, None when there is no such agent."""
+    spec = AGENT_REGISTRY.get(intent)
+    if spec is None:
+        return None
+
+    with _agents_lock:
+        if spec.target not in _agents:
+            module_name, function_name = spec.target.split(":")
+            _agents[spec.target] = getattr(importlib.import_module(module_name), function_name)
+        return _agents[spec.target]
+
+def preload_agents():
+    """Imports every registered agent, e.g. in the background at startup."""
+    for intent in AGENT_REGISTRY:
+        get_agent(intent)
+
+def execute_agent(intent: str, command: str, announce=None) -> str:
+    """Runs the agent for the intent on the agent runtime.
+
+    Without `announce` this waits for the result (at most the agent's deadline). With it,
+    a result not ready within AGENT_ACK_AFTER seconds is passed to announce(text) when
+    the job finishes, and the acknowledgement is returned instead.
+    """
     print(f"🤖 Executing agent: {intent}")
-    return AGENT_FUNCTIONS.get(intent, lambda _: "❌ Unknown agent.")(intent, command)
+    agent = get_agent(intent)
+    if agent is None:
+        return "❌ Unknown agent."
+
+    job = runtime.submit(AGENT_REGISTRY[intent], agent, intent, command)
+    if announce is None:
+        return job.result()
+    try:
+        return job.result(timeout=AGENT_ACK_AFTER)
+    except TimeoutError:
+        if job.done():
+            return job.result()
+        runtime.acknowledge(job, announce)
+        print(f"⏳ Agent {job.spec.name} continues in the background.")
+        return job.spec.ack
+
+def cancel_agents(session_id: str = None) -> int:
+    """Cancels the session's running and queued agent jobs, or all of them."""
+    return runtime.cancel(session_id)
 
+def get_agent_stats() -> dict:
+    return runtime.stats()
@@ -1,4 +1,6 @@
 import os
+import sessions
+from agents.runtime import run_pipeline
 from langgraph.graph import StateGraph
 from pydantic import BaseModel
 from typing import Dict, Any
@@ -9,10 +11,9 @@ load_dotenv()
 
 DEBUG_AI_RESPONSE = os.getenv("DEBUG_AI_RESPONSE", "false").lower() == "true"
 
-# Global state to keep track of lights
-light_state = None
-
 class LightControlState(BaseModel):
+    # The node to run: light_status, turn_on_lights or turn_off_lights
+    action: str = "light_status"
     status: str = "off"
     response: str = ""
 
@@ -39,30 +40,26 @@ graph.add_node("light_status", light_status)
 graph.add_node("turn_on_lights", turn_on_lights)
 graph.add_node("turn_off_lights", turn_off_lights)
 
-# Set initial entry point
-graph.set_entry_point("light_status")
+# Start at the node for the requested action
+graph.set_conditional_entry_point(lambda state: state.action, ["light_status", "turn_on_lights", "turn_off_lights"])
 
 # Compile the graph
 light_control_pipeline = graph.compile()
 
-# Initialize global state once
-light_state = LightControlState()
-
 def control_lights(intent: str, command: str) -> str:
-    global light_state
+    # Each session (client) has its own lights, the lock makes read-modify-write atomic
+    session = sessions.current()
 
     print(f"💡 Light control command: {command}, intent: {intent}")
 
-    if intent == "turn_on_lights":
-        result = turn_on_lights(light_state)
-        light_state = LightControlState(**result)
+    if intent not in ("turn_on_lights", "turn_off_lights"):
+        return "❌ Invalid command. Try: 'Turn on the lights' or 'Turn off the lights'."
 
-    elif intent == "turn_off_lights":
-        result = turn_off_lights(light_state)
+    with session.lock:
+        light_state = session.get("light_state") or LightControlState()
+        result = run_pipeline(light_control_pipeline, {"action": intent, "status": light_state.status})
         light_state = LightControlState(**result)
-
-    else:
-        return "❌ Invalid command. Try: 'Turn on the lights' or 'Turn off the lights'."
+        session.set("light_state", light_state)
 
     response = light_state.response
     print(f"💡 Light control response: {response}")
@@ -0,0 +1,212 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+import sessions
+from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Threads running agent pipelines, shared by every agent
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "4"))
+
+class AgentCancelled(Exception):
+    pass
+
+@dataclass(frozen=True)
+class AgentSpec:
+    """How an agent runs: its function, deadline in seconds once started and how many may run at once.
+
+    `title` names the job in spoken messages, `ack` is spoken when the result is not
+    ready right away and the job finishes in the background.
+    """
+    name: str
+    target: str
+    timeout: float
+    concurrency: int
+    title: str
+    ack: str = "Working on it, I'll let you know when it's done."
+
+class AgentJob:
+    """One agent run; result() is the spoken response, also for timeouts, cancellation and errors."""
+
+    def __init__(self, spec: AgentSpec, intent: str, command: str):
+        self.spec = spec
+        self.intent = intent
+        self.command = command
+        self.session_id = sessions.current().session_id
+        self.cancelled = threading.Event()
+        self.future = Future()
+        self.task = None
+
+    def cancel(self):
+        """Drops the job if it is still queued, otherwise stops it at the next pipeline step."""
+        self.cancelled.set()
+        if self.task is not None:
+            self.task.cancel()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: float = None) -> str:
+        return self.future.result(timeout)
+
+    def resolve(self, response: str) -> bool:
+        if self.future.done():
+            return False
+        self.future.set_result(response)
+        return True
+
+_current_job = contextvars.ContextVar("agent_job", default=None)
+
+def check_cancelled():
+    """Raises AgentCancelled once the running job is cancelled or past its deadline, for long pipeline steps."""
+    job = _current_job.get()
+    if job is not None and job.cancelled.is_set():
+        raise AgentCancelled(job.spec.name)
+
+def run_pipeline(pipeline, state: dict) -> dict:
+    """pipeline.invoke that stops between steps once its job is cancelled or past its deadline."""
+    values = state
+    for values in pipeline.stream(state, stream_mode="values"):
+        check_cancelled()
+    return values
+
+async def wait_for_thread(call: asyncio.Future):
+    """Waits until the executor call ends, also when the waiting task is cancelled again meanwhile."""
+    while not call.done():
+        try:
+            await asyncio.wait({call})
+        except asyncio.CancelledError:
+            pass
+
+class AgentRuntime:
+    """Runs agents on a worker pool from an event loop thread.
+
+    Each agent has its own concurrency limit (jobs over it wait in its queue) and a
+    deadline, after which the job answers with a timeout message and is cancelled.
+    A cancelled job stops at the next pipeline step or check_cancelled() call and
+    holds its concurrency slot until then.
+    """
+
+    def __init__(self, workers: int = AGENT_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent")
+        # Announcing may block on a full speech queue, it must not take agent workers
+        self.announcer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-announce")
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="agent-runtime", daemon=True)
+        self.thread.start()
+        self.semaphores = {}
+        self.jobs = set()
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def submit(self, spec: AgentSpec, agent, intent: str, command: str) -> AgentJob:
+        job = AgentJob(spec, intent, command)
+        # The job keeps the turn's session, trace and language
+        context = contextvars.copy_context()
+        with self._lock:
+            self.jobs.add(job)
+            metrics = self._agent_metrics(spec.name)
+            metrics["submitted"] += 1
+            metrics["queued"] += 1
+            metrics["max_queued"] = max(metrics["max_queued"], metrics["queued"])
+        job.task = asyncio.run_coroutine_threadsafe(self._run(job, agent, context), self.loop)
+        return job
+
+    def _agent_metrics(self, name: str) -> dict:
+        if name not in self._metrics:
+            self._metrics[name] = {"submitted": 0, "queued": 0, "max_queued": 0, "running": 0, "completed": 0,
+                                   "failed": 0, "timed_out": 0, "cancelled": 0, "acknowledged": 0,
+                                   "wait_seconds": 0.0, "run_seconds": 0.0}
+        return self._metrics[name]
+
+    def _update(self, name: str, **changes):
+        with self._lock:
+            metrics = self._agent_metrics(name)
+            for key, value in changes.items():
+                metrics[key] += value
+
+    def _call(self, job: AgentJob, agent) -> str:
+        _current_job.set(job)
+        return agent(job.intent, job.command)
+
+    async def _run(self, job: AgentJob, agent, context: contextvars.Context):
+        spec = job.spec
+        semaphore = self.semaphores.setdefault(spec.name, asyncio.Semaphore(spec.concurrency))
+        queued_at = time.perf_counter()
+        started_at = None
+        outcome = "completed"
+        try:
+            async with semaphore:
+                started_at = time.perf_counter()
+                self._update(spec.name, queued=-1, running=1, wait_seconds=started_at - queued_at)
+                if job.cancelled.is_set():
+                    raise AgentCancelled(spec.name)
+
+                call = self.loop.run_in_executor(self.executor, context.run, self._call, job, agent)
+                # Retrieved even when this task is cancelled first and the thread ends with AgentCancelled
+                call.add_done_callback(lambda future: future.cancelled() or future.exception())
+                try:
+                    job.resolve(await asyncio.wait_for(asyncio.shield(call), spec.timeout))
+                except asyncio.TimeoutError:
+                    outcome = "timed_out"
+                    job.cancelled.set()
+                    job.resolve(f"Sorry, the {spec.title} took too long.")
+                    print(f"⏱️ Agent {spec.name} passed its {spec.timeout:.0f} second deadline, cancelling it.")
+                    # The worker thread stops at the pipeline's next step, it keeps its slot until then
+                    await wait_for_thread(call)
+                except asyncio.CancelledError:
+                    job.cancelled.set()
+                    job.resolve(f"The {spec.title} was cancelled.")
+                    # Same for a cancelled job: the slot and the running count are released with the thread
+                    await wait_for_thread(call)
+                    raise
+        except (AgentCancelled, asyncio.CancelledError):
+            # A job past its deadline already answered, cancelling it only stops the wait for its thread
+            if outcome != "timed_out":
+                outcome = "cancelled"
+            job.resolve(f"The {spec.title} was cancelled.")
+        except Exception as e:
+            outcome = "failed"
+            print(f"❌ Agent {spec.name} failed: {e}")
+            job.resolve(f"Sorry, the {spec.title} failed.")
+        finally:
+            if started_at is None:
+                self._update(spec.name, queued=-1, **{outcome: 1})
+            else:
+                self._update(spec.name, running=-1, run_seconds=time.perf_counter() - started_at, **{outcome: 1})
+            with self._lock:
+                self.jobs.discard(job)
+
+    def acknowledge(self, job: AgentJob, announce):
+        """Counts the job as answered in the background and hands its result to announce(text) when done."""
+        self._update(job.spec.name, acknowledged=1)
+
+        def done(future: Future):
+            # Off the event loop: speaking the result may take a while
+            self.announcer.submit(announce, future.result())
+
+        job.future.add_done_callback(done)
+
+    def cancel(self, session_id: str = None) -> int:
+        """Cancels the session's jobs, or every job; returns how many."""
+        with self._lock:
+            jobs = [job for job in self.jobs if not job.done() and (session_id is None or job.session_id == session_id)]
+        for job in jobs:
+            job.cancel()
+        return len(jobs)
+
+    def stats(self) -> dict:
+        """Per agent: queue depth, running jobs, outcomes and mean wait and run times."""
+        with self._lock:
+            stats = {}
+            for name, metrics in self._metrics.items():
+                finished = metrics["completed"] + metrics["failed"] + metrics["timed_out"] + metrics["cancelled"]
+                stats[name] = {key: value for key, value in metrics.items() if not key.endswith("_seconds")}
+                stats[name]["mean_wait_ms"] = 1000 * metrics["wait_seconds"] / finished if finished else 0.0
+                stats[name]["mean_run_ms"] = 1000 * metrics["run_seconds"] / finished if finished else 0.0
+            return stats
@@ -1,11 +1,15 @@
 import os
 import re
+import asyncio
 import langgraph
 import requests
-from bs4 import BeautifulSoup
+import http_client
+from web_fetch import WEB_MAX_TEXT_CHARS, fetch_text
+from token_count import estimate_tokens
+from agents.runtime import check_cancelled, run_pipeline
 from langgraph.graph import StateGraph
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 
@@ -15,42 +19,138 @@ AGENT_API_URL = os.getenv("AGENT_API_URL")
 AGENT_MODEL = os.getenv("AGENT_MODEL")
 DEBUG_AI_RESPONSE = os.getenv("DEBUG_AI_RESPONSE", "false").lower() == "true"
 
+# "single" summarizes the start of the page in one prompt, "map_reduce" summarizes all of it in chunks
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "single").lower()
+# Page text fetched for map-reduce, split into chunks of about SUMMARY_CHUNK_TOKENS
+SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "60000"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1000"))
+# Chunk summaries requested from LM Studio at the same time
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+
+NO_SUMMARY = "No summary found."
+
+# Chunks are cut between sentences, CJK text has no spaces to cut on
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。！？；])\s*")
+
 class SummarizationState(BaseModel):
     url: str
-    html: str = ""
     text: str = ""
+    chunks: List[str] = []
+    summaries: List[str] = []
     summary: str = ""
 
-def fetch_webpage(state: SummarizationState) -> Dict[str, Any]:
-    response = requests.get(state.url)
-    return {"html": response.text} if response.status_code == 200 else {}
-
-def extract_text(state: SummarizationState) -> Dict[str, Any]:
-    soup = BeautifulSoup(state.html, 'html.parser')
-    for script_or_style in soup(['script', 'style']):
-        script_or_style.decompose()
-    text = ' '.join(soup.get_text(separator=' ').split())
-    return {"text": text[:5000]}
+def split_into_chunks(text: str, max_tokens: int = SUMMARY_CHUNK_TOKENS) -> List[str]:
+    """Packs whole sentences into chunks of at most max_tokens, a longer sentence is cut by length."""
+    chunks = []
+    current = ""
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        while estimate_tokens(sentence) > max_tokens:
+            cut = max(1, len(sentence) * max_tokens // estimate_tokens(sentence))
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut])
+            sentence = sentence[cut:]
+        candidate = f"{current} {sentence}".strip()
+        if current and estimate_tokens(candidate) > max_tokens:
+            chunks.append(current)
+            candidate = sentence
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
 
-def summarization(state: SummarizationState) -> Dict[str, Any]:
+def completion_payload(prompt: str) -> dict:
     payload = {
         "model": AGENT_MODEL,
-        "prompt": f"Summarize this:\n\n{state.text}",
+        "prompt": prompt,
         "max_length": 500
     }
 
     if DEBUG_AI_RESPONSE == "true":
         print(f"🤖 Sending to agent API: {payload}")
 
-    response = requests.post(f"{AGENT_API_URL}/completions", json=payload)
-    return {"summary": response.json().get("choices", [{}])[0].get("text", "No summary found.")}
+    return payload
+
+def completion_text(response: requests.Response) -> str:
+    """The completion's text, None for an error status or a reply without one."""
+    try:
+        response.raise_for_status()
+        return response.json()["choices"][0]["text"] or None
+    except requests.exceptions.HTTPError as e:
+        print(f"❌ Error communicating with agent API: {e}")
+    except (ValueError, KeyError, IndexError, TypeError):
+        print(f"❌ Unexpected reply from agent API: {response.text[:200]}")
+    return None
+
+async def summarize_async(prompt: str, semaphore: asyncio.Semaphore) -> str:
+    """The completion's text, None when it failed so that callers can leave it out."""
+    async with semaphore:
+        # A cancelled or late summary sends no more chunks, the ones already sent finish
+        check_cancelled()
+        try:
+            response = await http_client.async_post(f"{AGENT_API_URL}/completions", json=completion_payload(prompt))
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error communicating with agent API: {e}")
+            return None
+    return completion_text(response)
+
+async def summarize_all(prompts: List[str]) -> List[str]:
+    """Runs the prompts concurrently, at most SUMMARY_CONCURRENCY at a time, in order."""
+    semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    return await asyncio.gather(*(summarize_async(prompt, semaphore) for prompt in prompts))
+
+def fetch_webpage(state: SummarizationState) -> Dict[str, Any]:
+    # Streams and extracts in one pass, the download stops once there is enough text
+    text = fetch_text(state.url, max_chars=SUMMARY_MAX_CHARS if SUMMARY_MODE == "map_reduce" else WEB_MAX_TEXT_CHARS)
+    return {"text": text} if text else {}
+
+def summarize(prompt: str) -> str:
+    check_cancelled()
+    try:
+        response = http_client.post(f"{AGENT_API_URL}/completions", json=completion_payload(prompt))
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error communicating with agent API: {e}")
+        return NO_SUMMARY
+    return completion_text(response) or NO_SUMMARY
+
+def summarization(state: SummarizationState) -> Dict[str, Any]:
+    return {"summary": summarize(f"Summarize this:\n\n{state.text}")}
+
+def map_chunks(state: SummarizationState) -> Dict[str, Any]:
+    chunks = split_into_chunks(state.text)
+    print(f"📄 Summarizing {len(chunks)} chunks, {SUMMARY_CONCURRENCY} at a time...")
+    summaries = asyncio.run(summarize_all([f"Summarize this part of a web page:\n\n{chunk}" for chunk in chunks]))
+    return {"chunks": chunks, "summaries": [summary for summary in summaries if summary]}
+
+def reduce_summaries(state: SummarizationState) -> Dict[str, Any]:
+    summaries = state.summaries
+    if not summaries:
+        return {"summary": NO_SUMMARY}
+    if len(state.chunks) == 1:
+        return {"summary": summaries[0]}
+
+    # Too many partial summaries for one prompt: collapse them in groups first, still concurrently
+    while len(summaries) > 1 and estimate_tokens(" ".join(summaries)) > SUMMARY_CHUNK_TOKENS:
+        groups = split_into_chunks(" ".join(summaries))
+        if len(groups) >= len(summaries):
+            break
+        summaries = [summary for summary in asyncio.run(summarize_all(
+            [f"Combine these summaries into one:\n\n{group}" for group in groups])) if summary]
+
+    parts = "\n\n".join(f"- {summary.strip()}" for summary in summaries)
+    return {"summary": summarize(f"These are summaries of consecutive parts of one web page. Summarize the whole page:\n\n{parts}")}
+
+def choose_mode(state: SummarizationState) -> str:
+    return "map_chunks" if SUMMARY_MODE == "map_reduce" else "summarize_text"
 
 graph = StateGraph(SummarizationState)
 graph.add_node("fetch_webpage", fetch_webpage)
-graph.add_node("extract_text", extract_text)
 graph.add_node("summarize_text", summarization)
-graph.add_edge("fetch_webpage", "extract_text")
-graph.add_edge("extract_text", "summarize_text")
+graph.add_node("map_chunks", map_chunks)
+graph.add_node("reduce_summaries", reduce_summaries)
+graph.add_conditional_edges("fetch_webpage", choose_mode, ["summarize_text", "map_chunks"])
+graph.add_edge("map_chunks", "reduce_summaries")
 graph.set_entry_point("fetch_webpage")
 
 summarization_pipeline = graph.compile()
@@ -70,7 +170,7 @@ def summarize_webpage(intent: str, command: str) -> str:
             url = f"https://{url}"
         
         # Call the summarization agent
-        summary = summarization_pipeline.invoke({"url": url}).get("summary", "⚠️ No summary available.")
+        summary = run_pipeline(summarization_pipeline, {"url": url}).get("summary", "⚠️ No summary available.")
     else:
         summary = "❌ No valid URL found."
 
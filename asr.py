@@ -0,0 +1,219 @@
+import os
+import time
+import queue
+import threading
+import numpy as np
+from dataclasses import dataclass
+from concurrent.futures import Future
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "<model>" runs openai-whisper, "faster-whisper:<model>" the CTranslate2 engine (e.g. "faster-whisper:small")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL")
+# Weight type of faster-whisper models: int8 (quantized), int8_float32, float32...
+ASR_COMPUTE_TYPE = os.getenv("ASR_COMPUTE_TYPE", "int8")
+# CPU threads used by inference, 0 keeps the engine's default
+ASR_CPU_THREADS = int(os.getenv("ASR_CPU_THREADS", "0"))
+
+# Utterances decoded together, 1 transcribes each one on its own
+ASR_MAX_BATCH = int(os.getenv("ASR_MAX_BATCH", "4"))
+# How long the first utterance of a batch waits for others to join it
+ASR_MAX_WAIT_MS = float(os.getenv("ASR_MAX_WAIT_MS", "20"))
+
+RATE = 16000
+# Whisper's input window, longer audio needs transcribe()'s sliding window
+MAX_BATCH_SAMPLES = 30 * RATE
+
+# Same thresholds model.transcribe applies with no_speech_threshold=0.1
+NO_SPEECH_THRESHOLD = 0.1
+LOGPROB_THRESHOLD = -1.0
+
+@dataclass(frozen=True)
+class Transcript:
+    text: str
+    # Whisper's language detection, e.g. "en"
+    language: str = None
+
+class WhisperEngine:
+    """openai-whisper on PyTorch: FP16 on a GPU, FP32 on the CPU."""
+
+    # Several utterances can go through one decoder pass
+    batched = True
+
+    def __init__(self, model_name: str, compute_type: str = ASR_COMPUTE_TYPE, cpu_threads: int = ASR_CPU_THREADS):
+        import torch
+        import whisper
+
+        if cpu_threads:
+            torch.set_num_threads(cpu_threads)
+        self.model = whisper.load_model(model_name)
+        self.fp16 = self.model.device.type != "cpu"
+
+    def transcribe(self, audio: np.ndarray) -> Transcript:
+        result = self.model.transcribe(audio, no_speech_threshold=NO_SPEECH_THRESHOLD, fp16=self.fp16)
+        return Transcript(result["text"].strip(), result.get("language"))
+
+    def transcribe_words(self, audio: np.ndarray, prompt: str = "") -> list:
+        result = self.model.transcribe(audio, no_speech_threshold=NO_SPEECH_THRESHOLD, word_timestamps=True, fp16=self.fp16,
+                                       initial_prompt=prompt or None, condition_on_previous_text=False)
+        return [(word["start"], word["end"], word["word"]) for segment in result["segments"] for word in segment.get("words", [])]
+
+    def decode_batch(self, batch: list) -> list:
+        """One batched decoder pass over utterances of at most 30 s each."""
+        import torch
+        import whisper
+
+        model = self.model
+        # Per utterance: log_mel_spectrogram normalizes against the loudest frame of its input
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), n_mels=model.dims.n_mels)
+            for audio in batch
+        ]).to(model.device)
+        options = whisper.DecodingOptions(fp16=self.fp16, without_timestamps=True)
+        results = whisper.decode(model, mels, options)
+        return [Transcript("" if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+                           else result.text.strip(), result.language) for result in results]
+
+class FasterWhisperEngine:
+    """faster-whisper on CTranslate2, int8 quantized weights by default.
+
+    Decodes greedily with the same temperature fallback and no-speech rule as
+    openai-whisper's transcribe(), so transcripts differ only by quantization.
+    """
+
+    batched = False
+
+    def __init__(self, model_name: str, compute_type: str = ASR_COMPUTE_TYPE, cpu_threads: int = ASR_CPU_THREADS):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model_name, device="auto", compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def _transcribe(self, audio: np.ndarray, **options):
+        segments, info = self.model.transcribe(audio, beam_size=1, best_of=5, no_speech_threshold=NO_SPEECH_THRESHOLD,
+                                               log_prob_threshold=LOGPROB_THRESHOLD, **options)
+        # Segments are decoded lazily, while they are iterated
+        return list(segments), info
+
+    def transcribe(self, audio: np.ndarray) -> Transcript:
+        segments, info = self._transcribe(audio)
+        return Transcript("".join(segment.text for segment in segments).strip(), info.language)
+
+    def transcribe_words(self, audio: np.ndarray, prompt: str = "") -> list:
+        segments, _ = self._transcribe(audio, word_timestamps=True, initial_prompt=prompt or None, condition_on_previous_text=False)
+        return [(word.start, word.end, word.word) for segment in segments for word in segment.words or []]
+
+# WHISPER_MODEL prefix -> engine, no prefix is openai-whisper
+ENGINES = {
+    "whisper": WhisperEngine,
+    "faster-whisper": FasterWhisperEngine,
+}
+
+def parse_model(spec: str) -> tuple:
+    """("faster-whisper", "small") for "faster-whisper:small", ("whisper", "medium") for "medium"."""
+    backend, separator, model_name = (spec or "").partition(":")
+    if not separator:
+        return "whisper", spec
+    if backend not in ENGINES:
+        raise ValueError(f"Unknown ASR backend '{backend}' in WHISPER_MODEL, expected one of {', '.join(ENGINES)}")
+    return backend, model_name
+
+def load_engine(spec: str = WHISPER_MODEL, compute_type: str = ASR_COMPUTE_TYPE, cpu_threads: int = ASR_CPU_THREADS):
+    backend, model_name = parse_model(spec)
+    return ENGINES[backend](model_name, compute_type=compute_type, cpu_threads=cpu_threads)
+
+class WhisperASR:
+    """One ASR engine shared by every caller; inference runs one call at a time.
+
+    `get_engine` returns the loaded engine (e.g. BackgroundLoader.get), so callers
+    only wait for it when they first transcribe.
+    """
+
+    def __init__(self, get_engine):
+        self.get_engine = get_engine
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio: np.ndarray) -> Transcript:
+        """Transcribes float32 16 kHz mono samples in memory, no WAV file or ffmpeg."""
+        engine = self.get_engine()
+        with self.lock:
+            return engine.transcribe(audio)
+
+    def transcribe_words(self, audio: np.ndarray, prompt: str = "") -> list:
+        """Word-level transcription for streaming ASR, returns [(start, end, word), ...]."""
+        engine = self.get_engine()
+        with self.lock:
+            return engine.transcribe_words(audio, prompt)
+
+class BatchedWhisperASR(WhisperASR):
+    """Queues utterances and decodes those that arrive within max_wait of each other as one batch.
+
+    A lone utterance is transcribed exactly as before. Several are
+    padded to Whisper's 30 s window, their log-mel spectrograms stacked, and one
+    batched decoder pass transcribes them all (greedy, without transcribe()'s
+    temperature fallback).
+    """
+
+    def __init__(self, get_engine, max_batch: int = ASR_MAX_BATCH, max_wait: float = ASR_MAX_WAIT_MS / 1000):
+        super().__init__(get_engine)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.batched_utterances = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._schedule, name="asr-batch", daemon=True)
+        self._worker.start()
+
+    def transcribe(self, audio: np.ndarray) -> Transcript:
+        # Longer than one window: only transcribe() can slide over it
+        if len(audio) > MAX_BATCH_SAMPLES:
+            return super().transcribe(audio)
+        future = Future()
+        self._queue.put((audio, future))
+        return future.result()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _schedule(self):
+        while True:
+            batch = self._collect()
+            try:
+                engine = self.get_engine()
+                with self.lock:
+                    if len(batch) == 1:
+                        transcripts = [engine.transcribe(batch[0][0])]
+                    else:
+                        transcripts = engine.decode_batch([audio for audio, _ in batch])
+                self.batches += 1
+                self.batched_utterances += len(batch)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), transcript in zip(batch, transcripts):
+                future.set_result(transcript)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "utterances": self.batched_utterances,
+                "mean_batch": self.batched_utterances / self.batches if self.batches else 0.0}
+
+def create_asr(get_engine, max_batch: int = ASR_MAX_BATCH) -> WhisperASR:
+    """The batching scheduler, unless max_batch is 1 or the WHISPER_MODEL engine cannot batch.
+
+    Only the server has concurrent utterances to batch: with a single microphone every
+    utterance would wait max_wait for a partner that never comes, so the voice loop passes 1.
+    """
+    if max_batch > 1 and ENGINES[parse_model(WHISPER_MODEL)[0]].batched:
+        return BatchedWhisperASR(get_engine, max_batch=max_batch)
+    return WhisperASR(get_engine)
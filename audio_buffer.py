@@ -0,0 +1,97 @@
+import threading
+import numpy as np
+
+# Whisper works on 30 second windows, longer utterances are cut at the window
+MAX_UTTERANCE_SECONDS = 30
+
+class UtteranceBuffer:
+    """Preallocated int16 buffer the capture loop writes into, handed to Whisper as float32."""
+
+    def __init__(self, rate: int = 16000, max_seconds: float = MAX_UTTERANCE_SECONDS):
+        self.rate = rate
+        self.samples = np.zeros(int(rate * max_seconds), dtype=np.int16)
+        self._float_samples = np.zeros(len(self.samples), dtype=np.float32)
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def clear(self):
+        self.length = 0
+
+    def is_full(self) -> bool:
+        return self.length >= len(self.samples)
+
+    def duration(self) -> float:
+        return self.length / self.rate
+
+    def append(self, chunk: bytes):
+        """Copies one raw int16 chunk into the buffer, dropping samples past capacity."""
+        pcm = np.frombuffer(chunk, dtype=np.int16)
+        end = min(self.length + len(pcm), len(self.samples))
+        self.samples[self.length:end] = pcm[:end - self.length]
+        self.length = end
+
+    def to_float32(self) -> np.ndarray:
+        """Returns the captured audio scaled to [-1, 1], valid until the buffer is reused."""
+        out = self._float_samples[:self.length]
+        np.multiply(self.samples[:self.length], 1.0 / 32768.0, out=out, casting="unsafe")
+        return out
+
+class RingBuffer:
+    """Fixed-size int16 ring the capture thread writes into without ever blocking.
+
+    When the reader falls more than a full ring behind, the oldest samples are
+    dropped and counted in `overruns`.
+    """
+
+    def __init__(self, rate: int = 16000, seconds: float = 5.0):
+        self.rate = rate
+        self.samples = np.zeros(int(rate * seconds), dtype=np.int16)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.overruns = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def available(self) -> int:
+        with self._cond:
+            return self.write_pos - self.read_pos
+
+    def write(self, chunk: bytes):
+        pcm = np.frombuffer(chunk, dtype=np.int16)[-len(self.samples):]
+        capacity = len(self.samples)
+        with self._cond:
+            start = self.write_pos % capacity
+            first = min(len(pcm), capacity - start)
+            self.samples[start:start + first] = pcm[:first]
+            self.samples[:len(pcm) - first] = pcm[first:]
+            self.write_pos += len(pcm)
+            if self.write_pos - self.read_pos > capacity:
+                self.overruns += 1
+                self.read_pos = self.write_pos - capacity
+            self._cond.notify_all()
+
+    def read(self, count: int, timeout: float = None):
+        """Blocks until `count` samples are buffered, returns them as bytes or None on timeout/close."""
+        capacity = len(self.samples)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.closed or self.write_pos - self.read_pos >= count, timeout):
+                return None
+            if self.write_pos - self.read_pos < count:
+                return None
+            start = self.read_pos % capacity
+            first = min(count, capacity - start)
+            data = np.concatenate((self.samples[start:start + first], self.samples[:count - first]))
+            self.read_pos += count
+            return data.tobytes()
+
+    def clear(self):
+        """Skips everything buffered so far, e.g. audio captured before the wake word."""
+        with self._cond:
+            self.read_pos = self.write_pos
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
@@ -0,0 +1,105 @@
+import os
+import glob
+import queue
+import threading
+import pyaudio
+from dataclasses import dataclass, field
+from pydub import AudioSegment
+from tts import Speech
+
+@dataclass
+class Playback:
+    pcm: bytes
+    generation: int
+    earcon: bool = False
+    completed: bool = False
+    done: threading.Event = field(default_factory=threading.Event)
+
+class AudioOutputManager:
+    """Owns one long-lived output stream that earcons and speech are queued to.
+
+    Every `sounds/*.wav` is decoded and resampled once at startup, so an earcon
+    costs only a queue put. Playback is written in blocks by a single writer
+    thread and can be interrupted between blocks.
+    """
+
+    def __init__(self, pa: pyaudio.PyAudio, rate: int = 24000, block: int = 1024, sounds_dir: str = "sounds"):
+        self.rate = rate
+        self.block = block
+        self.earcons = self.load_earcons(sounds_dir)
+        self.stream = pa.open(format=pyaudio.paInt16, channels=1, rate=rate, output=True, frames_per_buffer=block)
+
+        # Bumped by stop(), anything queued under an older generation is dropped
+        self._generation = 0
+        self._current = None
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="audio-output", daemon=True)
+        self._writer.start()
+
+    def load_earcons(self, sounds_dir: str) -> dict:
+        earcons = {}
+        for path in sorted(glob.glob(os.path.join(sounds_dir, "*.wav"))):
+            sound = AudioSegment.from_file(path, format="wav")
+            sound = sound.set_channels(1).set_frame_rate(self.rate).set_sample_width(2)
+            earcons[os.path.splitext(os.path.basename(path))[0]] = sound.raw_data
+        return earcons
+
+    def to_pcm(self, speech: Speech) -> bytes:
+        if speech.rate == self.rate:
+            return speech.pcm
+        audio = AudioSegment(data=speech.pcm, sample_width=2, frame_rate=speech.rate, channels=1)
+        return audio.set_frame_rate(self.rate).raw_data
+
+    def _enqueue(self, pcm: bytes, earcon: bool = False) -> Playback:
+        playback = Playback(pcm, self._generation, earcon)
+        self._queue.put(playback)
+        return playback
+
+    def play(self, speech: Speech) -> bool:
+        """Plays speech and waits for it, returns False when interrupted."""
+        playback = self._enqueue(self.to_pcm(speech))
+        playback.done.wait()
+        return playback.completed
+
+    def play_async(self, speech: Speech) -> Playback:
+        return self._enqueue(self.to_pcm(speech))
+
+    def play_earcon(self, name: str, blocking: bool = False) -> Playback:
+        playback = self._enqueue(self.earcons[name], earcon=True)
+        if blocking:
+            playback.done.wait()
+        return playback
+
+    def is_playing(self) -> bool:
+        """True while speech (not an earcon) is being played."""
+        current = self._current
+        return current is not None and not current.earcon
+
+    def earcon_playing(self) -> bool:
+        current = self._current
+        return current is not None and current.earcon
+
+    def stop(self):
+        """Interrupts the current playback and drops everything queued."""
+        self._generation += 1
+
+    def _write_loop(self):
+        step = self.block * 2
+        while (playback := self._queue.get()) is not None:
+            if playback.generation == self._generation:
+                self._current = playback
+                for start in range(0, len(playback.pcm), step):
+                    if playback.generation != self._generation:
+                        break
+                    self.stream.write(playback.pcm[start:start + step])
+                else:
+                    playback.completed = True
+                self._current = None
+            playback.done.set()
+
+    def close(self):
+        self.stop()
+        self._queue.put(None)
+        self._writer.join()
+        self.stream.stop_stream()
+        self.stream.close()
@@ -0,0 +1,189 @@
+"""Accuracy, real-time factor and end-of-speech-to-text latency of ASR backends and endpointing rules.
+
+Each WAV (16 kHz mono 16-bit, one utterance) gets a second of near silence appended and is fed
+in capture-sized chunks to the real VadFrontEnd, like the voice loop. The end of speech is the
+last speech chunk; the text is ready once the endpointer fires and the utterance is transcribed.
+Three endpointing rules are compared:
+
+fixed:        always SILENCE_FRAMES quiet chunks (the old rule, ENDPOINT_ADAPTIVE=false)
+adaptive:     AdaptiveEndpointer on VAD evidence only (the default without STREAMING_ASR)
+streaming:    the STREAMING_ASR path, measured rather than simulated: the speech chunks are fed in
+              real time to a StreamingTranscriber, the quiet chunks nudge it and the endpointer
+              reads its partial transcript like the voice loop does, then finish() returns the text
+
+fixed and adaptive add a full transcription of the utterance to the endpoint delay. Accuracy is the
+word error rate against <name>.txt next to each WAV, or against the first backend's transcripts when
+there are none; "stream WER" is that of the streaming text.
+
+Usage: python benchmarks/bench_asr_backends.py [--models tiny faster-whisper:tiny] [--compute-type int8]
+       [--threads 0] [--interval 1.0] utterance.wav ...
+"""
+import os
+import sys
+import time
+import wave
+import argparse
+import statistics
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Same capture and endpointing settings as jasmine.py
+RATE = 16000
+CHUNK = 512
+VAD_MODE = 2
+VAD_FRAME_MS = 10
+SILENCE_FRAMES = 20
+CHUNK_SECONDS = CHUNK / RATE
+
+def load_chunks(path: str) -> list:
+    """A 16 kHz mono int16 WAV in capture-sized chunks, followed by a second of faint noise."""
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        data = wf.readframes(wf.getnframes())
+    data += (np.random.default_rng(0).standard_normal(RATE) * 20).astype(np.int16).tobytes()
+    step = CHUNK * 2
+    return [data[i:i + step] for i in range(0, len(data) - step + 1, step)]
+
+def load_reference(path: str):
+    reference = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(reference):
+        return None
+    with open(reference, encoding="utf-8") as f:
+        return " ".join(f.read().split())
+
+def word_error_rate(hypothesis: str, reference: str) -> float:
+    from streaming_asr import normalize_word
+
+    hypothesis = [word for word in map(normalize_word, hypothesis.split()) if word]
+    reference = [word for word in map(normalize_word, reference.split()) if word]
+    distances = list(range(len(hypothesis) + 1))
+    for i, expected in enumerate(reference, 1):
+        previous, distances[0] = distances[0], i
+        for j, word in enumerate(hypothesis, 1):
+            previous, distances[j] = distances[j], min(distances[j] + 1, distances[j - 1] + 1, previous + (expected != word))
+    return distances[-1] / max(len(reference), 1)
+
+def capture(chunks: list, vad) -> tuple:
+    """The utterance the voice loop records, its chunks from the first to the last speech chunk
+    (None for quiet ones, which are not recorded) and the VAD votes of every later chunk."""
+    vad.reset()
+    timeline = []
+    trailing = []
+    for chunk in chunks:
+        if vad.is_speech(chunk):
+            timeline.extend([None] * len(trailing))
+            timeline.append(chunk)
+            trailing = []
+        elif timeline:
+            trailing.append(vad.last_votes.copy())
+    audio = np.frombuffer(b"".join(chunk for chunk in timeline if chunk), dtype=np.int16).astype(np.float32) / 32768.0
+    return audio, timeline, trailing
+
+def endpoint_delay(endpointer, trailing: list) -> float:
+    """Seconds from the end of speech until the endpointer fires without a partial transcript."""
+    endpointer.reset()
+    for silence_frames, votes in enumerate(trailing, 1):
+        endpointer.observe_silence(votes)
+        if endpointer.is_endpoint(silence_frames):
+            return silence_frames * CHUNK_SECONDS
+    return len(trailing) * CHUNK_SECONDS
+
+def stream_turn(engine, timeline: list, trailing: list, endpointer, interval: float) -> tuple:
+    """Replays one utterance in real time through a StreamingTranscriber as the voice loop does.
+
+    Returns the text, seconds from the end of speech until finish() returned it, and until the endpointer fired.
+    """
+    from streaming_asr import StreamingTranscriber
+
+    stream = StreamingTranscriber(engine.transcribe_words, rate=RATE, interval=interval)
+    start_time = time.perf_counter()
+    for i, chunk in enumerate(timeline, 1):
+        if chunk:
+            stream.feed(chunk)
+        time.sleep(max(0.0, start_time + i * CHUNK_SECONDS - time.perf_counter()))
+
+    end_of_speech = time.perf_counter()
+    endpointer.reset()
+    for silence_frames, votes in enumerate(trailing, 1):
+        endpointer.observe_silence(votes)
+        if not stream.current_text():
+            stream.nudge()
+        time.sleep(max(0.0, end_of_speech + silence_frames * CHUNK_SECONDS - time.perf_counter()))
+        if endpointer.is_endpoint(silence_frames, stream.current_text()):
+            break
+    endpoint = time.perf_counter() - end_of_speech
+    text = stream.finish()
+    return text, time.perf_counter() - end_of_speech, endpoint
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=["tiny", "faster-whisper:tiny"], help="WHISPER_MODEL values")
+    parser.add_argument("--compute-type", default="int8", help="ASR_COMPUTE_TYPE of faster-whisper models")
+    parser.add_argument("--threads", type=int, default=0, help="ASR_CPU_THREADS, 0 for the engine's default")
+    parser.add_argument("--interval", type=float, default=1.0, help="STREAMING_ASR_INTERVAL of the streaming run")
+    parser.add_argument("wavs", nargs="+", help="16 kHz mono 16-bit WAV utterances, with optional <name>.txt transcripts")
+    args = parser.parse_args()
+
+    os.environ["ASR_COMPUTE_TYPE"] = args.compute_type
+    os.environ["ASR_CPU_THREADS"] = str(args.threads)
+    import startup
+    from vad import VadFrontEnd
+    from endpointing import AdaptiveEndpointer
+
+    vad = VadFrontEnd(rate=RATE, mode=VAD_MODE, frame_ms=VAD_FRAME_MS)
+    utterances = [capture(load_chunks(path), vad) for path in args.wavs]
+    references = [load_reference(path) for path in args.wavs]
+    audio_seconds = sum(len(audio) for audio, _, _ in utterances) / RATE
+
+    fixed = AdaptiveEndpointer(SILENCE_FRAMES, rate=RATE, chunk=CHUNK, adaptive=False)
+    adaptive = AdaptiveEndpointer(SILENCE_FRAMES, rate=RATE, chunk=CHUNK, adaptive=True)
+    fixed_delays = [endpoint_delay(fixed, trailing) for _, _, trailing in utterances]
+    adaptive_delays = [endpoint_delay(adaptive, trailing) for _, _, trailing in utterances]
+
+    print(f"🧠 {len(utterances)} utterances, {audio_seconds:.1f} s of speech, "
+          f"{sum(reference is not None for reference in references)} with reference transcripts")
+    print(f"⏸️ Endpoint after end of speech: fixed {statistics.mean(fixed_delays) * 1000:.0f} ms, "
+          f"adaptive {statistics.mean(adaptive_delays) * 1000:.0f} ms (mean)")
+    print(f"\n{'backend':<26}{'load s':>8}{'WER':>7}{'RTF':>7}{'fixed ms':>10}{'adaptive ms':>13}"
+          f"{'streaming ms':>14}{'endpoint ms':>13}{'stream WER':>12}")
+
+    first_texts = None
+    for model in args.models:
+        try:
+            start_time = time.perf_counter()
+            engine = startup.load_whisper(model)
+            load_seconds = time.perf_counter() - start_time
+        except Exception as e:
+            print(f"{model:<26}❌ {e}")
+            continue
+
+        texts, stream_texts, asr_seconds = [], [], []
+        latencies = {"fixed": [], "adaptive": [], "streaming": [], "endpoint": []}
+        for (audio, timeline, trailing), fixed_delay, adaptive_delay in zip(utterances, fixed_delays, adaptive_delays):
+            start_time = time.perf_counter()
+            text = engine.transcribe(audio).text if len(audio) else ""
+            seconds = time.perf_counter() - start_time
+            texts.append(text)
+            asr_seconds.append(seconds)
+            latencies["fixed"].append(fixed_delay + seconds)
+            latencies["adaptive"].append(adaptive_delay + seconds)
+
+            stream_text, stream_latency, endpoint = stream_turn(engine, timeline, trailing, adaptive, args.interval)
+            stream_texts.append(stream_text)
+            latencies["streaming"].append(stream_latency)
+            latencies["endpoint"].append(endpoint)
+
+        first_texts = first_texts or texts
+        expected = [reference if reference is not None else first for reference, first in zip(references, first_texts)]
+        errors = [word_error_rate(text, reference) for text, reference in zip(texts, expected)]
+        stream_errors = [word_error_rate(text, reference) for text, reference in zip(stream_texts, expected)]
+        rtf = sum(asr_seconds) / audio_seconds
+        print(f"{model:<26}{load_seconds:>8.1f}{statistics.mean(errors):>7.1%}{rtf:>7.2f}"
+              f"{statistics.mean(latencies['fixed']) * 1000:>10.0f}{statistics.mean(latencies['adaptive']) * 1000:>13.0f}"
+              f"{statistics.mean(latencies['streaming']) * 1000:>14.0f}{statistics.mean(latencies['endpoint']) * 1000:>13.0f}"
+              f"{statistics.mean(stream_errors):>12.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Throughput and latency of one-at-a-time versus micro-batched Whisper with several utterances waiting.
+
+--clients threads submit every utterance at once, as the server or a replay run would. Each
+batch size reports wall time, throughput (seconds of audio per second), per-utterance latency
+and how many transcripts differ from the one-at-a-time ones.
+
+Usage: python benchmarks/bench_asr_batch.py [--model tiny] [--batches 1 2 4 8] [--wait-ms 20] [--clients 8] [utterance.wav ...]
+"""
+import os
+import sys
+import time
+import wave
+import argparse
+import statistics
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RATE = 16000
+
+def load_audio(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+
+def synthetic_audio(count: int, seconds: float = 3.0) -> list:
+    rng = np.random.default_rng(0)
+    return [(rng.standard_normal(int(RATE * seconds)) * 0.05).astype(np.float32) for _ in range(count)]
+
+def run(asr, utterances: list, clients: int) -> tuple:
+    def timed(audio):
+        start_time = time.perf_counter()
+        text = asr.transcribe(audio).text
+        return text, time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(timed, utterances))
+    return time.perf_counter() - start_time, [text for text, _ in results], [seconds for _, seconds in results]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=os.getenv("WHISPER_MODEL", "tiny"))
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 2, 4, 8], help="ASR_MAX_BATCH values")
+    parser.add_argument("--wait-ms", type=float, default=20, help="ASR_MAX_WAIT_MS")
+    parser.add_argument("--clients", type=int, default=8, help="utterances submitted at the same time")
+    parser.add_argument("--count", type=int, default=16, help="synthetic utterances when no WAV is given")
+    parser.add_argument("wavs", nargs="*", help="16 kHz mono 16-bit WAV utterances")
+    args = parser.parse_args()
+
+    os.environ["WHISPER_MODEL"] = args.model
+    import startup
+    from asr import WhisperASR, BatchedWhisperASR
+
+    utterances = [load_audio(path) for path in args.wavs] if args.wavs else synthetic_audio(args.count)
+    audio_seconds = sum(len(audio) for audio in utterances) / RATE
+
+    engine = startup.load_whisper()
+    print(f"🧠 {len(utterances)} utterances, {audio_seconds:.1f} s of audio, model '{args.model}', {args.clients} clients")
+    print(f"{'batch':>6}{'wall s':>9}{'audio s/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'mean batch':>12}{'differ':>8}")
+
+    reference = None
+    for max_batch in args.batches:
+        if max_batch > 1 and not engine.batched:
+            print(f"{max_batch:>6}  ({args.model} cannot decode a batch)")
+            continue
+        if max_batch == 1:
+            asr = WhisperASR(lambda: engine)
+        else:
+            asr = BatchedWhisperASR(lambda: engine, max_batch=max_batch, max_wait=args.wait_ms / 1000)
+        wall, texts, latencies = run(asr, utterances, args.clients)
+        reference = reference or texts
+        differ = sum(text != expected for text, expected in zip(texts, reference))
+        mean_batch = asr.stats()["mean_batch"] if max_batch > 1 else 1.0
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        print(f"{max_batch:>6}{wall:>9.2f}{audio_seconds / wall:>11.1f}{statistics.median(latencies) * 1000:>9.0f}"
+              f"{p95 * 1000:>9.0f}{mean_batch:>12.1f}{differ:>8}")
+
+if __name__ == "__main__":
+    main()
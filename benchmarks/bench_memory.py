@@ -0,0 +1,93 @@
+"""Prompt size and latency of follow-up chat turns without memory, with full history and with bounded memory.
+
+The mock chat server charges --prefill-delay seconds per prompt token missing from a simulated
+prefix cache (like llama.cpp's slots). Full history sends ever longer prompts, but they extend the
+previous one, so latency grows slowly until the context is large. Bounded memory keeps prompts within
+CHAT_MEMORY_TOKENS by folding old turns into a summary in the background; the prefix only changes
+when that happens. "bounded, cold cache" clears the mock's cache before every turn to show how much
+of the latency the cache hits save.
+
+Usage: python benchmarks/bench_memory.py [--turns 40] [--budget 600] [--prefill-delay 0.002] [--chat-delay 0.05]
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_servers import MockDelays, MockServer, PrefixCache
+
+QUESTIONS = [
+    "What is Jasmine?",
+    "How does it know when I stop talking?",
+    "Why is that better than a fixed timeout?",
+    "What happens after the transcription?",
+    "How are the agents chosen?",
+    "What was the first thing I asked you?",
+    "How long does a summary take?",
+    "Why does the first answer take longer?",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40, help="follow-up questions per mode")
+    parser.add_argument("--budget", type=int, default=600, help="CHAT_MEMORY_TOKENS of the bounded mode")
+    parser.add_argument("--prefill-delay", type=float, default=0.002, help="seconds per uncached prompt token")
+    parser.add_argument("--chat-delay", type=float, default=0.05, help="seconds to the first chat token")
+    parser.add_argument("--agent-delay", type=float, default=0.5, help="seconds per summary of old turns")
+    args = parser.parse_args()
+
+    mock = MockServer(delays=MockDelays(chat=args.chat_delay, token=0.0, agent=args.agent_delay, prefill=args.prefill_delay)).start()
+    os.environ.update({
+        "ANYTHING_LLM_API_URL": f"{mock.url}/api",
+        "ANYTHING_LLM_CHAT_WORKSPACE": "chat",
+        "ANYTHING_LLM_CHAT_STREAM": "false",
+        "AGENT_API_URL": f"{mock.url}/v1",
+        "RESPONSE_CACHE_SIZE": "0",
+        "RESPONSE_CACHE_WORKSPACE_CHECK": "0",
+    })
+
+    import memory
+    import sessions
+    import startup
+    from dispatcher import dispatch_turn
+
+    startup.warm_up_language_id()
+
+    modes = (("stateless", 0, True), ("full history", 10 ** 9, True),
+             (f"bounded ({args.budget} tokens)", args.budget, True), ("bounded, cold cache", args.budget, False))
+
+    print(f"{'mode':<26}{'prompt tok':>11}{'max tok':>9}{'cached':>8}{'mean ms':>9}{'p95 ms':>8}{'last 10 ms':>11}{'summaries':>10}")
+    for label, budget, keep_cache in modes:
+        session = sessions.Session()
+        conversation = memory.ConversationMemory(budget=budget)
+        session.set("conversation", conversation)
+        mock.prefix_cache = PrefixCache()
+        first_prompt = len(mock.chat_prompts)
+        latencies = []
+
+        with sessions.activate(session), contextlib.redirect_stdout(io.StringIO()):
+            for turn in range(args.turns):
+                if not keep_cache:
+                    mock.prefix_cache = PrefixCache()
+                start_time = time.perf_counter()
+                dispatch_turn(QUESTIONS[turn % len(QUESTIONS)])
+                latencies.append(time.perf_counter() - start_time)
+            conversation.wait()
+
+        prompts = mock.chat_prompts[first_prompt:]
+        tokens = [total for total, _ in prompts]
+        cached_share = sum(cached for _, cached in prompts) / sum(tokens)
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(f"{label:<26}{statistics.mean(tokens):>11.0f}{max(tokens):>9}{cached_share:>8.0%}"
+              f"{statistics.mean(latencies) * 1000:>9.0f}{p95 * 1000:>8.0f}{statistics.mean(latencies[-10:]) * 1000:>11.0f}"
+              f"{conversation.compactions:>10}")
+
+    mock.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Replays recorded utterances through Jasmine's endpointing, Whisper and dispatch, fully offline.
+
+Every WAV in the directory (16 kHz mono 16-bit) is fed in capture-sized chunks to the real
+VadFrontEnd with the same endpointing rule as the voice loop. Each utterance is transcribed
+by Whisper and dispatched by dispatch_turn against local mock AnythingLLM/LM Studio servers
+(benchmarks/mock_servers.py); web pages for the summarization agent come from the mock too.
+Reports per-stage latency (p50/p95/p99), throughput and CPU/RSS.
+
+Usage: python benchmarks/bench_replay.py recordings/ [--model tiny] [--repeat 3] [--stream] [--tts]
+       [--transcripts] [--response-cache] [--jsonl traces.jsonl] [--chat-delay 0.5] [--token-delay 0.02] ...
+
+--transcripts skips Whisper and reads each utterance's text from <name>.txt next to the WAV.
+--response-cache reuses chat answers, so repeated commands skip the chat round trip.
+--tts also synthesizes every response sentence with the configured TTS engine (no playback).
+"""
+import io
+import os
+import sys
+import glob
+import time
+import wave
+import argparse
+import contextlib
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_servers import MockServer, add_delay_arguments, delays_from_arguments
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Same capture and endpointing settings as jasmine.py
+RATE = 16000
+CHUNK = 512
+VAD_MODE = 2
+VAD_FRAME_MS = 10
+SILENCE_FRAMES = 20
+
+def load_chunks(path: str) -> list:
+    """Splits a 16 kHz mono int16 WAV into capture-sized chunks, with trailing silence to endpoint on."""
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        data = wf.readframes(wf.getnframes())
+    data += bytes(CHUNK * 2 * (SILENCE_FRAMES + 1))
+    step = CHUNK * 2
+    return [data[i:i + step] for i in range(0, len(data) - step + 1, step)]
+
+def endpoint_utterances(chunks: list, vad, utterance, endpointer) -> list:
+    """The voice loop's rule: speech starts recording, up to SILENCE_FRAMES quiet chunks end it."""
+    vad.reset()
+    utterances = []
+    recording = False
+    silence_frames = 0
+
+    for chunk in chunks:
+        if vad.is_speech(chunk):
+            if not recording:
+                recording = True
+                utterance.clear()
+            utterance.append(chunk)
+            silence_frames = 0
+            endpointer.reset()
+        elif recording:
+            silence_frames += 1
+            endpointer.observe_silence(vad.last_votes)
+
+        if recording and (endpointer.is_endpoint(silence_frames) or utterance.is_full()):
+            utterances.append(utterance.to_float32().copy())
+            recording = False
+            silence_frames = 0
+
+    return utterances
+
+def route_web_to_mock(http_client, mock_url: str):
+    """Sends the summarization agent's page fetches to the mock server instead of the internet."""
+    real_get = http_client.get
+
+    def offline_get(url: str, **kwargs):
+        if url.startswith(mock_url):
+            return real_get(url, **kwargs)
+        parsed = urlparse(url)
+        return real_get(f"{mock_url}/{parsed.netloc}{parsed.path}", **kwargs)
+
+    http_client.get = offline_get
+
+class BenchSpeaker:
+    """Synthesizes the response like the voice loop would, without playing it."""
+
+    def __init__(self, chat, tracing):
+        self.chat = chat
+        self.tracing = tracing
+
+    def say(self, text: str):
+        self.say_sentences([text])
+
+    def say_sentences(self, sentences) -> str:
+        spoken = []
+        lang = None
+        for sentence in sentences:
+            lang = lang or self.chat.detect_spoken_language(sentence)
+            self.chat.synthesize_speech(sentence, lang)
+            self.tracing.mark("first_audio")
+            spoken.append(sentence)
+        return " ".join(spoken)
+
+def resource_usage() -> tuple:
+    """(CPU seconds, peak RSS in MB) of this process."""
+    if resource is None:
+        return time.process_time(), 0.0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return usage.ru_utime + usage.ru_stime, peak_rss
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wav_dir", help="directory of 16 kHz mono 16-bit WAV recordings")
+    parser.add_argument("--model", default=os.getenv("WHISPER_MODEL", "tiny"), help="Whisper model")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the directory this many times")
+    parser.add_argument("--stream", action="store_true", help="stream chat responses (ANYTHING_LLM_CHAT_STREAM)")
+    parser.add_argument("--tts", action="store_true", help="synthesize responses with the configured TTS engine")
+    parser.add_argument("--transcripts", action="store_true", help="use <name>.txt instead of Whisper")
+    parser.add_argument("--response-cache", action="store_true", help="reuse chat answers to repeated commands")
+    parser.add_argument("--jsonl", default="", help="also write every turn's trace to this file")
+    parser.add_argument("--verbose", action="store_true", help="show Jasmine's own output")
+    add_delay_arguments(parser)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.wav_dir, "*.wav")))
+    if not paths:
+        parser.error(f"no .wav files in {args.wav_dir}")
+
+    mock = MockServer(delays=delays_from_arguments(args)).start()
+
+    # Module level configuration is read at import time, so set it before importing Jasmine
+    os.environ.update({
+        "ANYTHING_LLM_API_URL": f"{mock.url}/api",
+        "ANYTHING_LLM_CHAT_WORKSPACE": "chat",
+        "ANYTHING_LLM_INTENT_WORKSPACE": mock.intent_workspace,
+        "ANYTHING_LLM_CHAT_STREAM": str(args.stream).lower(),
+        "AGENT_API_URL": f"{mock.url}/v1",
+        "WHISPER_MODEL": args.model,
+        "TRACE_ENABLED": "true",
+        "TRACE_JSONL": args.jsonl,
+        "TRACE_PROMETHEUS": "",
+        # Off by default so every --repeat pass measures the full chat round trip
+        "RESPONSE_CACHE_SIZE": str(int(os.getenv("RESPONSE_CACHE_SIZE", "0")) or 128) if args.response_cache else "0",
+    })
+
+    import chat
+    import tracing
+    import response_cache
+    import http_client
+    import startup
+    from vad import VadFrontEnd
+    from endpointing import AdaptiveEndpointer
+    from audio_buffer import UtteranceBuffer
+    from dispatcher import dispatch_turn
+
+    route_web_to_mock(http_client, mock.url)
+
+    # The voice loop loads these at startup, keep them out of the first turn
+    startup.warm_up_language_id()
+    startup.preload_agents()
+
+    engine = None
+    if not args.transcripts:
+        start_time = time.perf_counter()
+        engine = startup.load_whisper(args.model)
+        print(f"🧠 Whisper '{args.model}' loaded and warmed up in {time.perf_counter() - start_time:.2f} s")
+
+    vad = VadFrontEnd(rate=RATE, mode=VAD_MODE, frame_ms=VAD_FRAME_MS)
+    endpointer = AdaptiveEndpointer(SILENCE_FRAMES, rate=RATE, chunk=CHUNK)
+    utterance = UtteranceBuffer(rate=RATE)
+    speaker = BenchSpeaker(chat, tracing) if args.tts else None
+    output = None if args.verbose else io.StringIO()
+
+    turns = 0
+    audio_seconds = 0.0
+    cpu_start, _ = resource_usage()
+    wall_start = time.perf_counter()
+
+    for _ in range(args.repeat):
+        for path in paths:
+            chunks = load_chunks(path)
+            audio_seconds += len(chunks) * CHUNK / RATE
+
+            vad_start = time.perf_counter()
+            utterances = endpoint_utterances(chunks, vad, utterance, endpointer)
+            vad_seconds = (time.perf_counter() - vad_start) / max(len(utterances), 1)
+
+            for index, audio in enumerate(utterances):
+                trace = tracing.start_turn("replay")
+                trace.add_span("vad", vad_seconds)
+                trace.mark("endpoint")
+                with tracing.activate(trace), contextlib.redirect_stdout(output or sys.stdout):
+                    with trace.span("asr"):
+                        if engine is None:
+                            with open(os.path.splitext(path)[0] + ".txt", encoding="utf-8") as f:
+                                command, language_code = f.read().strip().splitlines()[index], None
+                        else:
+                            transcript = engine.transcribe(audio)
+                            command, language_code = transcript.text, transcript.language
+                    with trace.span("turn"):
+                        intent, _ = dispatch_turn(command, speaker=speaker, language_code=language_code)
+                trace.finish()
+                turns += 1
+                print(f"🔁 {os.path.basename(path)}[{index}] {intent:<16} {command}")
+
+            if output:
+                output.seek(0)
+                output.truncate()
+
+    wall_seconds = time.perf_counter() - wall_start
+    cpu_end, peak_rss = resource_usage()
+    mock.stop()
+
+    print(f"\n{'stage':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'count':>8}")
+    for name, stats in sorted(tracing.get_latency_summary().items()):
+        print(f"{name:<26}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}{stats['count']:>8}")
+
+    print(f"\n⏱️ {turns} turns in {wall_seconds:.2f} s: {turns / wall_seconds:.2f} turns/s, "
+          f"{audio_seconds / wall_seconds:.1f}x real time over {audio_seconds:.1f} s of audio")
+    print(f"🖥️ CPU {cpu_end - cpu_start:.2f} s ({(cpu_end - cpu_start) / wall_seconds * 100:.0f}% of one core), peak RSS {peak_rss:.0f} MB")
+    if args.response_cache:
+        print(f"💾 Response cache: {response_cache.response_cache.stats()}")
+    print(f"🧪 Mock requests: {dict(mock.requests)}")
+
+if __name__ == "__main__":
+    main()
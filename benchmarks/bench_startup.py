@@ -0,0 +1,79 @@
+"""Measures startup time of both entry points, each in a fresh interpreter.
+
+console: time to import console.py, and which audio/ASR modules it pulled in (should be none).
+voice:   time until Whisper (warmed up), Porcupine, PyAudio (device scan), langid and
+         the agents are all ready, loaded in parallel by startup.py versus one after another.
+
+Usage: python benchmarks/bench_startup.py [--runs 3] [--skip-voice]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+AUDIO_MODULES = ("pyaudio", "pvporcupine", "whisper", "torch", "webrtcvad", "pydub.playback", "langgraph")
+
+CONSOLE_SCRIPT = f"""
+import sys, json, time
+start = time.perf_counter()
+import console
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {AUDIO_MODULES!r} if m in sys.modules]}}))
+"""
+
+VOICE_SCRIPT = """
+import json, time, startup
+mode = "{mode}"
+start = time.perf_counter()
+if mode == "parallel":
+    loader = startup.start_voice_loading()
+    elapsed = loader.wait_all()
+    timings = loader.timings()
+else:
+    loader = startup.BackgroundLoader(max_workers=1)
+    timings = {{}}
+    for name, load in (("whisper", startup.load_whisper), ("porcupine", startup.load_porcupine),
+                       ("audio", startup.load_audio), ("langid", startup.warm_up_language_id),
+                       ("agents", startup.preload_agents)):
+        loader.start(name, load).exception()
+    elapsed = time.perf_counter() - start
+    timings = loader.timings()
+print(json.dumps({{"seconds": elapsed, "timings": timings, "errors": loader.errors()}}))
+"""
+
+def run(script: str) -> dict:
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--skip-voice", action="store_true", help="only measure the console entry point")
+    args = parser.parse_args()
+
+    results = [run(CONSOLE_SCRIPT) for _ in range(args.runs)]
+    print(f"🖥️  console import: median {statistics.median(r['seconds'] for r in results) * 1000:.0f} ms")
+    print(f"   audio/ASR modules loaded: {results[0]['loaded'] or 'none'}")
+
+    if args.skip_voice:
+        return
+
+    for mode in ("sequential", "parallel"):
+        try:
+            results = [run(VOICE_SCRIPT.format(mode=mode)) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"❌ voice {mode}: {e}")
+            continue
+        print(f"🎤 voice models ready ({mode}): median {statistics.median(r['seconds'] for r in results):.2f} s")
+        errors = results[-1]["errors"]
+        for name, seconds in sorted(results[-1]["timings"].items()):
+            print(f"   {name:<10} {seconds:.2f} s" + (f"  ❌ {errors[name]}" if name in errors else ""))
+
+if __name__ == "__main__":
+    main()
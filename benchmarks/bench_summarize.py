@@ -0,0 +1,54 @@
+"""Compares single-prompt and map-reduce summarization of short and long pages against a mock LM Studio.
+
+Each completion takes --agent-delay seconds, so wall time shows how many LM Studio round trips
+are on the critical path: one for single, about two (map, then reduce) for map-reduce however
+long the page is, versus one per chunk when the chunks are summarized one after another.
+
+Usage: python benchmarks/bench_summarize.py [--agent-delay 1.0] [--paragraphs 20 200 800] [--concurrency 4]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_servers import MockDelays, MockServer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agent-delay", type=float, default=1.0, help="seconds per LM Studio completion")
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[20, 200, 800], help="page lengths to summarize")
+    parser.add_argument("--concurrency", type=int, default=4, help="map-reduce SUMMARY_CONCURRENCY")
+    args = parser.parse_args()
+
+    mock = MockServer(delays=MockDelays(agent=args.agent_delay, web=0.0)).start()
+    os.environ["AGENT_API_URL"] = f"{mock.url}/v1"
+    os.environ["WEB_CACHE_DIR"] = tempfile.mkdtemp(prefix="jasmine-web-")
+
+    from agents import summarization
+
+    modes = (("single", "single", 1), ("map-reduce, sequential", "map_reduce", 1),
+             (f"map-reduce, {args.concurrency} at a time", "map_reduce", args.concurrency))
+
+    print(f"{'page':>10}{'chunks':>8}  {'mode':<28}{'seconds':>8}{'calls':>7}")
+    for paragraphs in args.paragraphs:
+        url = f"{mock.url}/page?paragraphs={paragraphs}"
+        # Fetch once so every mode reads the page from the cache
+        text = summarization.fetch_text(url, max_chars=summarization.SUMMARY_MAX_CHARS)
+        chunks = len(summarization.split_into_chunks(text))
+
+        for label, mode, concurrency in modes:
+            summarization.SUMMARY_MODE = mode
+            summarization.SUMMARY_CONCURRENCY = concurrency
+            calls = mock.requests["agent"]
+            start_time = time.perf_counter()
+            summarization.summarization_pipeline.invoke({"url": url})
+            elapsed = time.perf_counter() - start_time
+            print(f"{len(text):>9}c{chunks:>8}  {label:<28}{elapsed:>8.2f}{mock.requests['agent'] - calls:>7}")
+
+    mock.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compares per-utterance latency of the WAV/ffmpeg transcription path with the in-memory one.
+
+Usage: python benchmarks/bench_transcribe.py [--model tiny] [--runs 10] [utterance.wav ...]
+"""
+import os
+import sys
+import time
+import wave
+import argparse
+import tempfile
+import statistics
+import numpy as np
+import whisper
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_buffer import UtteranceBuffer
+
+RATE = 16000
+CHUNK = 512
+
+def load_chunks(path: str) -> list:
+    """Splits a 16 kHz mono int16 WAV into capture-sized chunks."""
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        data = wf.readframes(wf.getnframes())
+    step = CHUNK * 2
+    return [data[i:i + step] for i in range(0, len(data), step)]
+
+def synthetic_chunks(seconds: float = 3.0) -> list:
+    rng = np.random.default_rng(0)
+    data = (rng.standard_normal(int(RATE * seconds)) * 1000).astype(np.int16).tobytes()
+    step = CHUNK * 2
+    return [data[i:i + step] for i in range(0, len(data), step)]
+
+def wav_file_path(chunks: list, model=None) -> float:
+    """The legacy path: join, write a temp WAV, let whisper decode it through ffmpeg."""
+    start = time.perf_counter()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_audio:
+        tmp_filename = tmp_audio.name
+    with wave.open(tmp_filename, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(b"".join(chunks))
+    if model is None:
+        whisper.load_audio(tmp_filename)
+    else:
+        model.transcribe(tmp_filename, no_speech_threshold=0.1)
+    os.remove(tmp_filename)
+    return time.perf_counter() - start
+
+def in_memory_path(chunks: list, utterance: UtteranceBuffer, model=None) -> float:
+    """The new path: chunks already sit in the preallocated buffer, converted in place."""
+    utterance.clear()
+    for chunk in chunks:
+        utterance.append(chunk)
+    start = time.perf_counter()
+    audio = utterance.to_float32()
+    if model is not None:
+        model.transcribe(audio, no_speech_threshold=0.1)
+    return time.perf_counter() - start
+
+def report(name: str, samples: list):
+    ms = [s * 1000 for s in samples]
+    print(f"  {name:<12} mean {statistics.mean(ms):8.2f} ms   median {statistics.median(ms):8.2f} ms   max {max(ms):8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wavs", nargs="*", help="16 kHz mono int16 WAV utterances (default: 3 s of noise)")
+    parser.add_argument("--model", default=None, help="also time full transcription with this Whisper model")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    utterances = [(path, load_chunks(path)) for path in args.wavs] or [("synthetic 3 s", synthetic_chunks())]
+    model = whisper.load_model(args.model) if args.model else None
+    utterance = UtteranceBuffer(rate=RATE)
+
+    for name, chunks in utterances:
+        print(f"🔄 {name} ({len(chunks) * CHUNK / RATE:.2f} s)")
+
+        # Front end only: what the in-memory path removes, independent of decoder noise
+        report("wav+ffmpeg", [wav_file_path(chunks) for _ in range(args.runs)])
+        report("in-memory", [in_memory_path(chunks, utterance) for _ in range(args.runs)])
+
+        if model is not None:
+            print("  full transcription:")
+            report("wav+ffmpeg", [wav_file_path(chunks, model) for _ in range(args.runs)])
+            report("in-memory", [in_memory_path(chunks, utterance, model) for _ in range(args.runs)])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Local stand-ins for AnythingLLM, LM Studio and web pages, with configurable delays.
+
+One HTTP server answers:
+  POST /api/v1/openai/chat/completions   intent workspace: a label picked by keyword
+                                         chat workspace:   a canned answer, as SSE when "stream" is set;
+                                         prompt prefill is charged per token missing from a simulated prefix cache
+  POST /v1/completions                   LM Studio completion for the agents
+  POST /api/v1/openai/embeddings         hashed bag-of-words vectors, similar wording gives similar vectors
+  GET  /api/v1/workspace/<slug>          the workspace's documents, changed with MockServer.workspace_documents
+  GET  anything else                     an HTML page for the summarization agent, ?paragraphs=N sets its length
+
+Usage: python benchmarks/mock_servers.py [--port 3001] [--chat-delay 0.5] [--token-delay 0.02] ...
+"""
+import re
+import sys
+import math
+import zlib
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHAT_RESPONSE = (
+    "Sure, here is a short answer. Jasmine runs the language models locally, so nothing leaves your machine. "
+    "Speech is transcribed by Whisper, the intent is classified, and then a chat model or an agent answers. "
+    "The answer is spoken sentence by sentence while the rest is still being generated."
+)
+
+SUMMARY_RESPONSE = "The page describes a local voice assistant and how its pipeline answers spoken questions."
+
+PAGE_PARAGRAPH = (
+    "Jasmine is a voice assistant that runs entirely on local hardware. It listens for a wake word, "
+    "records until the speaker stops, transcribes the audio with Whisper and answers with a local model. "
+)
+
+# First match wins, anything else is a chat question
+INTENT_KEYWORDS = (
+    ("summar", "summarization"),
+    ("总结", "summarization"),
+    ("turn on", "turn_on_lights"),
+    ("开灯", "turn_on_lights"),
+    ("turn off", "turn_off_lights"),
+    ("关灯", "turn_off_lights"),
+)
+
+TOKEN_PATTERN = re.compile(r"\S+\s*")
+WORD_PATTERN = re.compile(r"\w+")
+EMBEDDING_SIZE = 256
+
+@dataclass
+class MockDelays:
+    intent: float = 0.3
+    chat: float = 0.5
+    token: float = 0.02
+    agent: float = 1.0
+    web: float = 0.1
+    # Seconds per chat prompt token that is not in the prefix cache
+    prefill: float = 0.0
+    # Seconds a chat stream stays open after [DONE], like a server that is slow to close it
+    after_done: float = 0.0
+
+def mock_intent(prompt: str) -> str:
+    # The intent prompt ends with "Intent: {command}", only look at the command
+    match = re.search(r"Intent:\s*(.+)", prompt)
+    command = (match.group(1) if match else prompt).lower()
+    for keyword, intent in INTENT_KEYWORDS:
+        if keyword in command:
+            return intent
+    return "llm"
+
+def mock_embedding(text: str) -> list:
+    vector = [0.0] * EMBEDDING_SIZE
+    for word in WORD_PATTERN.findall(text.lower()):
+        vector[zlib.crc32(word.encode("utf-8")) % EMBEDDING_SIZE] += 1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+def render_prompt(messages: list) -> str:
+    """The chat template a local server would apply before tokenizing."""
+    return "".join(f"<|{message['role']}|>{message['content']}<|end|>" for message in messages) + "<|assistant|>"
+
+def common_prefix(a: str, b: str) -> int:
+    length = min(len(a), len(b))
+    for index in range(length):
+        if a[index] != b[index]:
+            return index
+    return length
+
+class PrefixCache:
+    """Like a llama.cpp server's slots: each keeps the last prompt plus its generated answer,
+    a request reuses the slot sharing the longest prefix and only prefills the rest."""
+
+    def __init__(self, slots: int = 4):
+        self.slots = [""] * slots
+        self.lock = threading.Lock()
+
+    def lookup(self, prompt: str) -> int:
+        """Characters of the prompt already cached; the slot then holds the prompt."""
+        with self.lock:
+            matches = [common_prefix(prompt, cached) for cached in self.slots]
+            best = max(range(len(self.slots)), key=matches.__getitem__)
+            cached = matches[best]
+            # Slots are kept least recently used first, without a match the oldest is evicted
+            del self.slots[best if cached else 0]
+            self.slots.append(prompt)
+            return cached
+
+    def extend(self, prompt: str, answer: str):
+        with self.lock:
+            if prompt in self.slots:
+                self.slots[self.slots.index(prompt)] = prompt + answer
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        if self.path.endswith("/chat/completions"):
+            if body.get("model") == self.server.intent_workspace:
+                self.server.count("intent")
+                time.sleep(self.server.delays.intent)
+                self.send_json({"choices": [{"message": {"content": mock_intent(body["messages"][-1]["content"])}}]})
+            elif body.get("stream"):
+                self.server.count("chat_stream")
+                prefill = self.server.prefill(body.get("messages", []))
+                self.send_chat_stream(prefill)
+            else:
+                self.server.count("chat")
+                prefill = self.server.prefill(body.get("messages", []))
+                time.sleep(self.server.delays.chat + prefill + self.server.delays.token * len(TOKEN_PATTERN.findall(self.server.chat_response)))
+                self.send_json({"choices": [{"message": {"content": self.server.chat_response}}]})
+
+        elif self.path.endswith("/embeddings"):
+            self.server.count("embedding")
+            self.send_json({"data": [{"embedding": mock_embedding(body.get("input", ""))}]})
+
+        elif self.path.endswith("/completions"):
+            self.server.count("agent")
+            time.sleep(self.server.delays.agent)
+            self.send_json({"choices": [{"text": SUMMARY_RESPONSE}]})
+
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        if self.path.startswith("/api/v1/workspace/"):
+            self.server.count("workspace")
+            slug = self.path.rsplit("/", 1)[-1]
+            self.send_json({"workspace": {"slug": slug, "documents": self.server.workspace_documents}})
+            return
+
+        self.server.count("web")
+        time.sleep(self.server.delays.web)
+        count = int(parse_qs(urlsplit(self.path).query).get("paragraphs", [self.server.page_paragraphs])[0])
+        paragraphs = f"<p>{PAGE_PARAGRAPH}</p>" * count
+        html = f"<html><body><h1>Jasmine</h1>{paragraphs}</body></html>"
+        self.send_body(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def send_json(self, data: dict):
+        self.send_body(json.dumps(data).encode("utf-8"), "application/json")
+
+    def send_body(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chat_stream(self, prefill: float = 0.0):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(self.server.delays.chat + prefill)
+        pending = b""
+        for token in TOKEN_PATTERN.findall(self.server.chat_response):
+            event = f"data: {json.dumps({'choices': [{'delta': {'content': token}}]}, ensure_ascii=False)}\n\n"
+            pending = self.write_pieces(pending + event.encode("utf-8"))
+            time.sleep(self.server.delays.token)
+        self.write_pieces(pending + b"data: [DONE]\n\n", flush=True)
+        time.sleep(self.server.delays.after_done)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_pieces(self, data: bytes, flush: bool = False) -> bytes:
+        """Writes whole events, or stream_chunk_bytes pieces cutting through lines and characters; returns the rest."""
+        size = self.server.stream_chunk_bytes or len(data)
+        while data and (len(data) >= size or flush):
+            self.write_chunk(data[:size])
+            data = data[size:]
+        return data
+
+    def write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+class MockServer(ThreadingHTTPServer):
+    """Serves every mock endpoint on one port from a background thread."""
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, delays: MockDelays = None, intent_workspace: str = "intent", page_paragraphs: int = 50):
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.delays = delays or MockDelays()
+        self.intent_workspace = intent_workspace
+        self.page_paragraphs = page_paragraphs
+        self.workspace_documents = [{"docpath": "custom-documents/jasmine.json"}]
+        self.chat_response = CHAT_RESPONSE
+        # Streamed chat bodies are sent in pieces of this many bytes, None sends one event per chunk
+        self.stream_chunk_bytes = None
+        self.prefix_cache = PrefixCache()
+        # (prompt tokens, cached prompt tokens) of every chat request
+        self.chat_prompts = []
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on purpose, e.g. a cancelled chat stream or a closed keep-alive connection
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def count(self, endpoint: str):
+        with self._lock:
+            self.requests[endpoint] += 1
+
+    def prefill(self, messages: list) -> float:
+        """Seconds to prefill the chat prompt, only the part missing from the prefix cache counts."""
+        prompt = render_prompt(messages)
+        cached = self.prefix_cache.lookup(prompt)
+        self.prefix_cache.extend(prompt, self.chat_response)
+        # Rough tokens: 4 characters each
+        tokens, cached_tokens = len(prompt) // 4 + 1, cached // 4
+        with self._lock:
+            self.chat_prompts.append((tokens, cached_tokens))
+        return self.delays.prefill * (tokens - cached_tokens)
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-servers", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def add_delay_arguments(parser: argparse.ArgumentParser):
+    defaults = MockDelays()
+    parser.add_argument("--intent-delay", type=float, default=defaults.intent, help="seconds per intent classification")
+    parser.add_argument("--chat-delay", type=float, default=defaults.chat, help="seconds to the first chat token")
+    parser.add_argument("--token-delay", type=float, default=defaults.token, help="seconds between chat tokens")
+    parser.add_argument("--agent-delay", type=float, default=defaults.agent, help="seconds per LM Studio completion")
+    parser.add_argument("--web-delay", type=float, default=defaults.web, help="seconds per web page fetch")
+    parser.add_argument("--prefill-delay", type=float, default=defaults.prefill, help="seconds per uncached chat prompt token")
+
+def delays_from_arguments(args) -> MockDelays:
+    return MockDelays(intent=args.intent_delay, chat=args.chat_delay, token=args.token_delay,
+                      agent=args.agent_delay, web=args.web_delay, prefill=args.prefill_delay)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=3001)
+    add_delay_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(args.port, delays_from_arguments(args))
+    print(f"🧪 Mock servers on {server.url}: ANYTHING_LLM_API_URL={server.url}/api AGENT_API_URL={server.url}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import os
+import re
 import json
-import langid
-import tempfile
+import threading
 import requests
-from gtts import gTTS
-from pydub import AudioSegment
-from pydub.playback import play
+import http_client
+import language
+import memory
+import response_cache
+import tracing
+import tts
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,50 +19,71 @@ ANYTHING_LLM_API_KEY = os.getenv("ANYTHING_LLM_API_KEY")
 ANYTHING_LLM_API_CHAT_URL = f"{ANYTHING_LLM_API_URL}/v1/openai/chat/completions"
 ANYTHING_LLM_CHAT_WORKSPACE = os.getenv("ANYTHING_LLM_CHAT_WORKSPACE")
 ANYTHING_LLM_CHAT_TEMPERATURE = os.getenv("ANYTHING_LLM_CHAT_TEMPERATURE")
-
-FIRST_LANGUAGE_NAME = os.getenv("FIRST_LANGUAGE_NAME")
-FIRST_LANGUAGE_CODE = os.getenv("FIRST_LANGUAGE_CODE")
-SECOND_LANGUAGE_NAME = os.getenv("SECOND_LANGUAGE_NAME")
-SECOND_LANGUAGE_CODE = os.getenv("SECOND_LANGUAGE_CODE")
-SECOND_LANGUAGE_SPOKEN_CODE = os.getenv("SECOND_LANGUAGE_SPOKEN_CODE")
+ANYTHING_LLM_CHAT_STREAM = os.getenv("ANYTHING_LLM_CHAT_STREAM", "false").lower() == "true"
 
 DEBUG_AI_RESPONSE = os.getenv("DEBUG_AI_RESPONSE", "false").lower() == "true"
 
+CHAT_HEADERS = {
+    "Authorization": f"Bearer {ANYTHING_LLM_API_KEY}",
+    "Content-Type": "application/json",
+    "accept": "*/*"
+}
+
+# Sentences shorter than this are merged with the next one before synthesis
+MIN_SENTENCE_CHARS = int(os.getenv("MIN_SENTENCE_CHARS", "20"))
+
+# Latin terminators need trailing whitespace (avoids "3.14", "e.g."), CJK ones don't
+SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+|[。！？；]+")
+
 def detect_prompt_language(text: str) -> str:
-    detected_lang = langid.classify(text)[0]
-    print(f"🔍 Detected prompt language: {detected_lang}")
-    return SECOND_LANGUAGE_NAME if detected_lang == SECOND_LANGUAGE_CODE else FIRST_LANGUAGE_NAME
+    """Name of the turn's language, for the system prompt."""
+    return language.resolve(text).name
 
 def detect_spoken_language(text: str) -> str:
-    detected_lang = langid.classify(text)[0]
-    if DEBUG_AI_RESPONSE == "true":
-        print(f"🔍 Detected spoken language: {detected_lang}")
-    return SECOND_LANGUAGE_SPOKEN_CODE if detected_lang == SECOND_LANGUAGE_CODE else FIRST_LANGUAGE_CODE
+    """TTS voice code of the turn's language, the same decision as the prompt's."""
+    return language.resolve(text).spoken
 
-def send_command_to_ai(command: str):
+def chat_system_prompt(lang: str) -> str:
+    return f"{AI_ASSISTANT_PROMPT}\n\nResponse only in {lang}."
+
+def build_chat_payload(command: str, stream: bool = False) -> dict:
     lang = detect_prompt_language(command)
-    system_prompt = f"{AI_ASSISTANT_PROMPT}\n\nResponse only in {lang}."
 
-    payload = {
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": command}
-        ],
+    return {
+        # Earlier turns of the session's conversation come between the system prompt and the command
+        "messages": memory.current().messages(chat_system_prompt(lang), command),
         "model": ANYTHING_LLM_CHAT_WORKSPACE,
         "temperature": ANYTHING_LLM_CHAT_TEMPERATURE,
-        "stream": False,
+        "stream": stream,
     }
 
+def lookup_cached_response(command: str) -> response_cache.Lookup:
+    """The cached answer to the command in this workspace, language and system prompt, if any."""
+    response_cache.watch_workspace(ANYTHING_LLM_CHAT_WORKSPACE)
+    lang = detect_prompt_language(command)
+    # A follow-up's answer depends on the conversation before it
+    context = memory.current().fingerprint()
+    key = (ANYTHING_LLM_CHAT_WORKSPACE, lang, chat_system_prompt(lang), context, response_cache.normalize_query(command))
+    return response_cache.response_cache.lookup(key)
+
+def cache_response(lookup: response_cache.Lookup, response: str):
+    response_cache.response_cache.store(lookup, response)
+
+def remember_turn(command: str, response: str):
+    """Adds the answered command to the session's conversation for follow-up questions."""
+    memory.current().record(command, response)
+
+def send_command_to_ai(command: str):
+    payload = build_chat_payload(command)
+
     if DEBUG_AI_RESPONSE == "true": 
         print(f"🤖 Sending to chat AI: {payload}")
 
-    headers = {
-        "Authorization": f"Bearer {ANYTHING_LLM_API_KEY}",
-        "Content-Type": "application/json",
-        "accept": "*/*"
-    }
-
-    response = requests.post(ANYTHING_LLM_API_CHAT_URL, headers=headers, data=json.dumps(payload))
+    try:
+        response = http_client.post(ANYTHING_LLM_API_CHAT_URL, headers=CHAT_HEADERS, data=json.dumps(payload))
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error communicating with AI: {e}")
+        return None
 
     if DEBUG_AI_RESPONSE == "true":
         print(f"🤖 AI Response: {response.text}")
@@ -72,16 +96,96 @@ def send_command_to_ai(command: str):
         print(f"❌ Error communicating with AI: {response.status_code}")
         return None
 
+def stream_command_to_ai(command: str, completed: threading.Event = None, on_response=None):
+    """Yields response tokens as they arrive from the chat SSE stream.
+
+    Sets `completed` once the whole response was received, not when it was cut short.
+    `on_response` gets the open HTTP response, so another thread can http_client.abort() it.
+    """
+    payload = build_chat_payload(command, stream=True)
+
+    if DEBUG_AI_RESPONSE:
+        print(f"🤖 Streaming from chat AI: {payload}")
+
+    try:
+        response = http_client.post(ANYTHING_LLM_API_CHAT_URL, headers=CHAT_HEADERS, data=json.dumps(payload), stream=True)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error communicating with AI: {e}")
+        return
+
+    if on_response is not None:
+        on_response(response)
+
+    with response:
+        if response.status_code != 200:
+            print(f"❌ Error communicating with AI: {response.status_code}")
+            return
+
+        # SSE is always UTF-8, requests would otherwise guess ISO-8859-1 for text/*
+        response.encoding = "utf-8"
+        first_token = True
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    print(f"❌ JSON Decode Error: SSE data = {data}")
+                    continue
+
+                choices = chunk.get("choices") or [{}]
+                token = (choices[0].get("delta") or {}).get("content")
+                if token:
+                    if first_token:
+                        tracing.mark("first_token")
+                        first_token = False
+                    yield token
+        except requests.exceptions.RequestException as e:
+            if not getattr(response, "aborted", False):
+                print(f"❌ Chat stream interrupted: {e}")
+            return
+        if completed is not None:
+            completed.set()
+
+def split_sentences(tokens):
+    """Regroups a token stream into sentences as soon as each one is complete."""
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            if match.end() - start >= MIN_SENTENCE_CHARS:
+                yield buffer[start:match.end()].strip()
+                start = match.end()
+        buffer = buffer[start:]
+
+    if buffer.strip():
+        yield buffer.strip()
+
+def synthesize_speech(text: str, lang: str) -> tts.Speech:
+    with tracing.span("tts"):
+        return tts.synthesize(text, lang)
+
+def play_speech(speech: tts.Speech):
+    # Imported here so text-only entry points never load audio playback
+    from pydub import AudioSegment
+    from pydub.playback import play
+
+    tracing.mark("first_audio")
+    play(AudioSegment(data=speech.pcm, sample_width=2, frame_rate=speech.rate, channels=1))
+
 def stream_voice_response(text: str):
     lang = detect_spoken_language(text)
     print(f"🎤 Speaking AI response in {lang}...")
 
     try:
-        tts = gTTS(text=text, lang=lang, slow=False)
-        with tempfile.NamedTemporaryFile(delete=True, suffix=".mp3") as tmp_audio:
-            tts.save(tmp_audio.name)
-            audio = AudioSegment.from_file(tmp_audio.name, format="mp3")
-            play(audio)
-            print(f"🎤 Speaking ended...")
+        play_speech(synthesize_speech(text, lang))
+        print(f"🎤 Speaking ended...")
     except Exception as e:
-        print(f"❌ Failed to generate speech: {e}")
\ No newline at end of file
+        print(f"❌ Failed to generate speech: {e}")
@@ -1,7 +1,13 @@
 import re
-from chat import send_command_to_ai
-from intent import classify_intent
-from agents.agent_manager import execute_agent
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+import tracing
+from concurrent.futures import ThreadPoolExecutor
+from dispatcher import dispatch_turn
 
 def main():
     while True:
@@ -9,24 +15,98 @@ def main():
         if command.lower() in ["exit", "quit"]:
             break
 
-        # Classify intent (LLM chat or agent)
-        intent = classify_intent(command)
+        # Classify intent and run chat or the agent
+        trace = tracing.start_turn("console")
+        with tracing.activate(trace):
+            dispatch_turn(command)
+        trace.finish()
 
-        print(f"🤖 Intent: {intent}")
-
-        if intent == "llm" or intent == "other":
-            send_command_to_ai(command)
+def read_batch(lines) -> list:
+    """One command per line, either plain text or a JSONL object with a "command" (and optional "id")."""
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            item = json.loads(line)
+            if "command" not in item:
+                raise ValueError(f"JSONL item without a command: {line}")
+            items.append(item)
         else:
-            execute_agent(intent, command)
+            items.append({"command": line})
+    return items
+
+def run_item(index: int, item: dict) -> dict:
+    # Always timed, also recorded with the other turns when tracing is enabled
+    trace = tracing.TurnTrace("batch")
+    result = {"index": index, **item}
+    start_time = time.perf_counter()
+    try:
+        with tracing.activate(trace):
+            result["intent"], result["response"] = dispatch_turn(item["command"])
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start_time, 4)
+    result["timings"] = {name: round(seconds, 4) for name, seconds in trace.latencies().items()}
+    if tracing.TRACE_ENABLED:
+        trace.finish()
+    return result
+
+async def run_batch(items: list, output, concurrency: int = 4):
+    """Dispatches up to `concurrency` commands at a time, writes results as JSONL in input order."""
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch"))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, item: dict) -> dict:
+        async with semaphore:
+            return await asyncio.to_thread(run_item, index, item)
+
+    tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(items)]
+    # Awaited in order: each result is written as soon as everything before it is done
+    for task in tasks:
+        output.write(json.dumps(await task, ensure_ascii=False) + "\n")
+        output.flush()
+
+def main_batch(path: str, output_path: str, concurrency: int):
+    if path == "-":
+        items = read_batch(sys.stdin)
+    else:
+        with open(path, encoding="utf-8") as f:
+            items = read_batch(f)
+
+    # Load langid's model before the workers start, not inside the first commands
+    from startup import warm_up_language_id
+    warm_up_language_id()
+
+    output = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    start_time = time.perf_counter()
+    try:
+        # Jasmine's own progress output would interleave with the results, send it to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            asyncio.run(run_batch(items, output, concurrency))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"✅ {len(items)} commands in {time.perf_counter() - start_time:.2f} seconds, {concurrency} at a time.", file=sys.stderr)
 
 def cleanup():
     """Gracefully stops all resources."""
     print("🛑 Cleaning up resources...")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jasmine console, interactive or batch.")
+    parser.add_argument("--batch", metavar="FILE", help="run the commands in FILE (text or JSONL, - for stdin) and exit")
+    parser.add_argument("--output", metavar="FILE", help="write batch results to FILE instead of stdout")
+    parser.add_argument("--concurrency", type=int, default=4, help="batch commands dispatched at the same time")
+    args = parser.parse_args()
+
     try:
-        main()
+        if args.batch:
+            main_batch(args.batch, args.output, args.concurrency)
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n🛑 Exiting...")
         cleanup()
-        exit(0)
\ No newline at end of file
+        exit(0)
@@ -0,0 +1,220 @@
+import os
+import time
+import queue
+import threading
+import contextvars
+import language
+import tracing
+import http_client
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from chat import (ANYTHING_LLM_CHAT_STREAM, send_command_to_ai, stream_command_to_ai, split_sentences,
+                  lookup_cached_response, cache_response, remember_turn)
+from intent import classify_intent_locally, classify_intent_remotely
+from agents.agent_manager import execute_agent
+
+load_dotenv()
+
+# Start the chat completion while the intent LLM is still classifying the command
+SPECULATIVE_CHAT = os.getenv("SPECULATIVE_CHAT", "false").lower() == "true"
+
+CHAT_INTENTS = ("llm", "other")
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-chat")
+
+_stats_lock = threading.Lock()
+_stats = {"started": 0, "used": 0, "cancelled": 0, "wasted_seconds": 0.0, "wasted_tokens": 0}
+
+def get_dispatch_stats() -> dict:
+    """Speculative chat requests started, used, cancelled and the work thrown away."""
+    with _stats_lock:
+        return dict(_stats)
+
+def is_chat_intent(intent: str) -> bool:
+    return intent in CHAT_INTENTS
+
+class SpeculativeChat:
+    """A streamed chat completion started before the intent is known, cancellable until then."""
+
+    def __init__(self, command: str):
+        self.tokens = queue.Queue()
+        self.cancelled = threading.Event()
+        self.response = None
+        self._response_lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.token_count = 0
+        self.completed = threading.Event()
+        with _stats_lock:
+            _stats["started"] += 1
+        # Copy the context so the turn's trace sees the first token
+        self.future = _executor.submit(contextvars.copy_context().run, self._run, command)
+
+    def _attach(self, response):
+        with self._response_lock:
+            self.response = response
+            if not self.cancelled.is_set():
+                return
+        # Cancelled while waiting for the response headers
+        http_client.abort(response)
+
+    def _run(self, command: str):
+        stream = stream_command_to_ai(command, self.completed, on_response=self._attach)
+        try:
+            for token in stream:
+                if self.cancelled.is_set():
+                    break
+                self.tokens.put(token)
+                self.token_count += 1
+        finally:
+            # Closing the generator closes the HTTP response, which aborts generation server side
+            stream.close()
+            # An aborted stream ends like a finished one
+            if self.cancelled.is_set():
+                self.completed.clear()
+            self.tokens.put(None)
+            with _stats_lock:
+                self.finished_at = time.perf_counter()
+                if self.cancelled.is_set():
+                    self._record_waste()
+
+    def _record_waste(self):
+        _stats["wasted_seconds"] += self.finished_at - self.started_at
+        _stats["wasted_tokens"] += self.token_count
+
+    def iter_tokens(self):
+        with _stats_lock:
+            _stats["used"] += 1
+        while (token := self.tokens.get()) is not None:
+            yield token
+
+    def cancel(self):
+        """Stops the completion, also while it waits for its first token (retrieval or prompt processing)."""
+        with _stats_lock:
+            _stats["cancelled"] += 1
+            self.cancelled.set()
+            # Already finished: the whole completion was wasted
+            if self.finished_at is not None:
+                self._record_waste()
+        with self._response_lock:
+            response = self.response
+        if response is not None:
+            http_client.abort(response)
+
+class TokenCollector:
+    """Passes tokens through and keeps them, complete only if they were all consumed."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.parts = []
+        self.consumed = False
+
+    def __iter__(self):
+        for token in self.tokens:
+            self.parts.append(token)
+            yield token
+        self.consumed = True
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+def print_tokens(tokens) -> str:
+    response = []
+    for token in tokens:
+        if not response:
+            print("📝 AI Response: ", end="", flush=True)
+        print(token, end="", flush=True)
+        response.append(token)
+    if response:
+        print()
+    return "".join(response)
+
+def dispatch_turn(command: str, speaker=None, language_code: str = None):
+    """Classifies the command, runs chat or the agent and speaks the result with `speaker`.
+
+    `language_code` is Whisper's detection, otherwise the language is identified from
+    the command once. Without a speaker the response is printed. Returns (intent, response).
+    """
+    with language.activate(language.TurnLanguage(language_code)):
+        return _dispatch_turn(command, speaker)
+
+def _dispatch_turn(command: str, speaker):
+    with tracing.span("classify_intent"):
+        intent = classify_intent_locally(command)
+
+    speculative = None
+    cached = None
+    if intent is None:
+        # Only a slow LLM classification is worth racing against, and not when the answer is cached
+        if SPECULATIVE_CHAT:
+            cached = lookup_cached_response(command)
+            if cached.response is None:
+                speculative = SpeculativeChat(command)
+        with tracing.span("classify_intent"):
+            intent = classify_intent_remotely(command)
+
+    print(f"🤖 Intent: {intent}")
+
+    if not is_chat_intent(intent):
+        if speculative:
+            speculative.cancel()
+        # A speaker that can announce lets a slow agent finish in the background
+        announce = None
+        if hasattr(speaker, "announce"):
+            def announce(text: str):
+                with language.activate(language.TurnLanguage()):
+                    speaker.announce(text)
+        with tracing.span("execute_agent"):
+            response = execute_agent(intent, command, announce)
+        if speaker and response:
+            # Agents answer with their own fixed phrases, not in the turn's language
+            with language.activate(language.TurnLanguage()):
+                speaker.say(response)
+        return intent, response
+
+    cached = cached or lookup_cached_response(command)
+    if cached.response is not None:
+        # Straight to speech, no RAG or generation
+        print(f"💾 Cached response: {cached.response}")
+        if speaker:
+            speaker.say(cached.response)
+        remember_turn(command, cached.response)
+        return intent, cached.response
+
+    completed = threading.Event()
+    if speculative:
+        tokens = speculative.iter_tokens()
+        completed = speculative.completed
+    elif ANYTHING_LLM_CHAT_STREAM:
+        tokens = stream_command_to_ai(command, completed)
+    else:
+        with tracing.span("send_command_to_ai"):
+            response = send_command_to_ai(command)
+        cache_response(cached, response)
+        remember_turn(command, response)
+        if speaker and response:
+            speaker.say(response)
+        return intent, response
+
+    tokens = TokenCollector(tokens)
+    # Streamed: covers the whole generation, which overlaps with synthesis of the first sentences
+    with tracing.span("send_command_to_ai"):
+        if speaker and ANYTHING_LLM_CHAT_STREAM:
+            # Spoken sentence by sentence while the response is still generating
+            response = speaker.say_sentences(split_sentences(tokens))
+            if response:
+                print(f"📝 AI Response: {response}")
+        elif speaker:
+            response = "".join(tokens)
+            print(f"📝 AI Response: {response}")
+            if response:
+                speaker.say(response)
+        else:
+            response = print_tokens(tokens)
+
+    # Not a response cut short by barge-in or a dropped connection
+    if tokens.consumed and completed.is_set():
+        cache_response(cached, tokens.text())
+    # After barge-in only what was spoken is part of the conversation
+    remember_turn(command, response)
+    return intent, response or None
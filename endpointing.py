@@ -0,0 +1,66 @@
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shorten the silence that ends an utterance when it clearly ended, false always waits the full window
+ENDPOINT_ADAPTIVE = os.getenv("ENDPOINT_ADAPTIVE", "true").lower() == "true"
+# Shortest silence that ends an utterance, for a finished sentence followed by clean silence
+ENDPOINT_MIN_SILENCE_MS = float(os.getenv("ENDPOINT_MIN_SILENCE_MS", "200"))
+
+SENTENCE_END = ".?!。？！"
+# A partial transcript ending like this is a pause mid-sentence, not the end of it
+CONTINUATION_MARKS = ",;:-，、"
+CONTINUATION_WORDS = {"and", "or", "but", "so", "because", "the", "a", "an", "to", "of", "with", "for", "in", "on",
+                      "at", "my", "your", "is", "um", "uh", "er", "like", "then", "if", "that"}
+
+def transcript_certainty(partial: str) -> float:
+    """How sure the partial transcript is that the sentence is over: 1, 0.5 or 0 (unknown or mid-sentence)."""
+    text = partial.strip()
+    if not text:
+        return 0.0
+    # Whisper punctuates fragments too ("Turn on the."), so the last word is checked before the full stop
+    words = text.rstrip(SENTENCE_END).split()
+    if not words or text.rstrip(SENTENCE_END)[-1] in CONTINUATION_MARKS:
+        return 0.0
+    if re.sub(r"[^\w]", "", words[-1].lower()) in CONTINUATION_WORDS:
+        return 0.0
+    return 1.0 if text[-1] in SENTENCE_END else 0.5
+
+class AdaptiveEndpointer:
+    """Trailing silence needed to end an utterance, between min_silence_ms and max_frames chunks.
+
+    Two kinds of evidence shorten it, each for half of the range: the trailing silence
+    is clean (no VAD subframe voted speech, rather than a quiet or breathy pause), and
+    the partial transcript, when there is an up to date one, ends a sentence. With
+    neither, or with adaptive off, it waits the full max_frames like a fixed endpointer.
+    """
+
+    def __init__(self, max_frames: int, rate: int = 16000, chunk: int = 512,
+                 min_silence_ms: float = ENDPOINT_MIN_SILENCE_MS, adaptive: bool = ENDPOINT_ADAPTIVE):
+        self.max_frames = max_frames
+        self.min_frames = min(max_frames, max(1, round(min_silence_ms / 1000 * rate / chunk)))
+        self.adaptive = adaptive
+        self.reset()
+
+    def reset(self):
+        """Forgets the trailing silence, at speech."""
+        self.silent_chunks = 0
+        self.clean_chunks = 0
+
+    def observe_silence(self, votes=None):
+        """Counts one silent chunk; `votes` are its VAD subframe decisions (VadFrontEnd.last_votes)."""
+        self.silent_chunks += 1
+        if votes is not None and len(votes) and not any(votes):
+            self.clean_chunks += 1
+
+    def required_frames(self, partial: str = "") -> int:
+        if not self.adaptive:
+            return self.max_frames
+        vad_certainty = self.clean_chunks / self.silent_chunks if self.silent_chunks else 0.0
+        certainty = (vad_certainty + transcript_certainty(partial)) / 2
+        return round(self.max_frames - (self.max_frames - self.min_frames) * certainty)
+
+    def is_endpoint(self, silence_frames: int, partial: str = "") -> bool:
+        return silence_frames > self.required_frames(partial)
@@ -0,0 +1,88 @@
+import os
+import socket
+import asyncio
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "8"))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def base_url(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def get_session(url: str) -> requests.Session:
+    """Returns the keep-alive session pooled for the URL's scheme://host:port."""
+    key = base_url(url)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            # Retry refused connections and gateway errors, never a request that timed
+            # out mid-generation: that would only double the wait
+            retry = Retry(
+                total=HTTP_MAX_RETRIES,
+                read=0,
+                backoff_factor=HTTP_BACKOFF_FACTOR,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=None,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[key] = session
+        return session
+
+def request(method: str, url: str, timeout=None, **kwargs) -> requests.Response:
+    """requests.request over the pooled session, with the configured (connect, read) timeouts."""
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    return get_session(url).request(method, url, timeout=timeout, **kwargs)
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+def abort(response: requests.Response):
+    """Ends a streamed response that another thread may be blocked reading, which then sees the end of the body.
+
+    response.close() would wait for that read, i.e. for the server's next bytes.
+    """
+    response.aborted = True
+    try:
+        response.raw._fp.fp.raw._sock.shutdown(socket.SHUT_RDWR)
+    except (AttributeError, OSError):
+        # Already read to the end or closed
+        pass
+
+async def async_request(method: str, url: str, **kwargs) -> requests.Response:
+    """Runs a pooled request in a worker thread so several can be awaited concurrently."""
+    return await asyncio.to_thread(request, method, url, **kwargs)
+
+async def async_get(url: str, **kwargs) -> requests.Response:
+    return await async_request("GET", url, **kwargs)
+
+async def async_post(url: str, **kwargs) -> requests.Response:
+    return await async_request("POST", url, **kwargs)
+
+def close():
+    """Closes every pooled connection."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -1,3 +1,3 @@
 #!/bin/bash
 
-pip install ffmpeg openai-whisper numpy pyaudio pvporcupine pvrecorder requests gtts pydub langid python-dotenv webrtcvad scipy langgraph beautifulsoup4
+pip install ffmpeg openai-whisper faster-whisper numpy pyaudio pvporcupine requests gtts pydub langid python-dotenv webrtcvad scipy langgraph websockets
@@ -1,7 +1,17 @@
 import os
+import re
 import json
+import math
+import time
+import threading
+import contextvars
 import requests
+import http_client
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from cache import LRUCache
+from agents.agent_manager import AGENT_REGISTRY
 
 load_dotenv()
 
@@ -14,11 +24,179 @@ ANYTHING_LLM_API_CHAT_URL = f"{ANYTHING_LLM_API_URL}/v1/openai/chat/completions"
 ANYTHING_LLM_INTENT_WORKSPACE = os.getenv("ANYTHING_LLM_INTENT_WORKSPACE")
 ANYTHING_LLM_INTENT_TEMPERATURE = os.getenv("ANYTHING_LLM_INTENT_TEMPERATURE")
 
+INTENT_HEADERS = {
+    "Authorization": f"Bearer {ANYTHING_LLM_API_KEY}",
+    "Content-Type": "application/json"
+}
+
+# Local classifier results at or above this confidence skip the LLM round trip
+INTENT_LOCAL_THRESHOLD = float(os.getenv("INTENT_LOCAL_THRESHOLD", "0.6"))
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "256"))
+
 DEBUG_AI_RESPONSE = os.getenv("DEBUG_AI_RESPONSE", "false").lower() == "true"
 
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+STOP_WORDS = {"a", "an", "the", "to", "if", "it", "asks", "for", "of", "is", "and", "please", "can", "you", "could", "would", "me"}
+URL_PATTERN = r"(https?://\S+|www\.\S+|\b[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b)"
+
+# (label, confidence, pattern) checked in order, only labels known to the prompt are used
+INTENT_RULES = [
+    ("summarization", 0.95, re.compile(rf"\b(summari[sz]e|summary|tl;?dr)\b.*{URL_PATTERN}|{URL_PATTERN}.*\b(summari[sz]e|summary)\b", re.I)),
+    ("turn_on_lights", 0.95, re.compile(r"\b(turn|switch|put)\s+on\s+(the\s+|all\s+)?(\w+\s+)?(lights?|lamps?)\b|\b(turn|switch|put)\s+(the\s+|all\s+)?(\w+\s+)?(lights?|lamps?)\s+on\b|^(the\s+)?(lights?|lamps?)\s+on\b|开灯", re.I)),
+    ("turn_off_lights", 0.95, re.compile(r"\b(turn|switch|put)\s+off\s+(the\s+|all\s+)?(\w+\s+)?(lights?|lamps?)\b|\b(turn|switch|put)\s+(the\s+|all\s+)?(\w+\s+)?(lights?|lamps?)\s+off\b|^(the\s+)?(lights?|lamps?)\s+off\b|关灯", re.I)),
+    ("llm", 0.75, re.compile(r"^(what|who|whom|whose|why|how|when|where|which|is|are|do|does|tell me|explain)\b|[?？]$", re.I)),
+]
+
+def normalize_command(command: str) -> str:
+    return " ".join(re.sub(r"[^\w\s./:?？-]", " ", command.lower()).split())
+
+def tokenize(text: str) -> list:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+def parse_intent_labels(prompt: str) -> dict:
+    """Reads '- "label" description' lines of the intent prompt into {label: description}."""
+    labels = {}
+    for match in re.finditer(r'^\s*-\s*\\?"(\w+)\\?"\s*(.*)$', prompt or "", re.M):
+        labels[match.group(1)] = match.group(2)
+    return labels
+
+class LocalIntentClassifier:
+    """Keyword rules backed by a TF-IDF nearest-neighbour index over the intent labels."""
+
+    def __init__(self, documents: dict, rules: list = INTENT_RULES):
+        self.labels = list(documents)
+        self.rules = [rule for rule in rules if rule[0] in documents]
+
+        term_counts = {label: Counter(tokenize(text)) for label, text in documents.items()}
+        document_frequency = Counter(term for counts in term_counts.values() for term in counts)
+        self.idf = {term: math.log((1 + len(documents)) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        self.vectors = {label: self.vectorize(counts) for label, counts in term_counts.items()}
+
+    def vectorize(self, counts: Counter) -> dict:
+        vector = {term: count * self.idf[term] for term, count in counts.items() if term in self.idf}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def classify(self, command: str):
+        """Returns (label, confidence), confidence is the best match's lead over the runner-up."""
+        for label, confidence, pattern in self.rules:
+            if pattern.search(command):
+                return label, confidence
+
+        query = self.vectorize(Counter(tokenize(command)))
+        scores = sorted(
+            ((sum(weight * vector.get(term, 0.0) for term, weight in query.items()), label)
+             for label, vector in self.vectors.items()),
+            reverse=True)
+        if not scores or scores[0][0] == 0.0:
+            return "other", 0.0
+
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        return scores[0][1], scores[0][0] - runner_up
+
+def build_intent_documents() -> dict:
+    """One document per label: its prompt description plus the agent name spelled out."""
+    documents = {label: f"{label.replace('_', ' ')} {description}"
+                 for label, description in parse_intent_labels(INTENT_CLASSIFICATION_PROMPT).items()}
+    for agent in AGENT_REGISTRY:
+        documents[agent] = f"{documents.get(agent, '')} {agent.replace('_', ' ')}".strip()
+    return documents
+
+local_classifier = LocalIntentClassifier(build_intent_documents())
+intent_cache = LRUCache(maxsize=INTENT_CACHE_SIZE)
+
+# Intent LLM requests started from a partial transcript, by normalized command, until they finish
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="intent-prefetch")
+_prefetching = {}
+_prefetching_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {"local": 0, "llm": 0, "local_seconds": 0.0, "llm_seconds": 0.0}
+
+def _record(tier: str, seconds: float):
+    with _stats_lock:
+        _stats[tier] += 1
+        _stats[f"{tier}_seconds"] += seconds
+
+def get_intent_stats() -> dict:
+    """Cache hit rate, how often each tier answered and its mean latency."""
+    with _stats_lock:
+        stats = {"cache": intent_cache.stats()}
+        for tier in ("local", "llm"):
+            count = _stats[tier]
+            stats[tier] = {"count": count, "mean_ms": 1000 * _stats[f"{tier}_seconds"] / count if count else 0.0}
+        return stats
+
+def classify_intent_locally(command: str):
+    """Cache and local classifier only, returns None when the intent LLM is needed."""
+    key = normalize_command(command)
+    intent = intent_cache.get(key)
+    if intent is not None:
+        return intent
+
+    start_time = time.perf_counter()
+    intent, confidence = local_classifier.classify(key)
+    _record("local", time.perf_counter() - start_time)
+
+    if DEBUG_AI_RESPONSE:
+        print(f"🔍 Local intent: {intent} ({confidence:.2f})")
+
+    if confidence < INTENT_LOCAL_THRESHOLD:
+        return None
+
+    intent_cache.set(key, intent)
+    return intent
+
 def classify_intent(command: str) -> str:
+    """Cache, then local classifier, then the intent LLM when the local result is not confident."""
+    return classify_intent_locally(command) or classify_intent_remotely(command)
+
+def prefetch_intent(command: str):
+    """Starts the intent LLM on a partial transcript in the background, when the local tiers cannot tell.
+
+    If the final command is the same, classify_intent_remotely waits for this request
+    (or finds its answer in the cache) instead of starting another one.
+    """
+    if classify_intent_locally(command) is not None:
+        return
+    key = normalize_command(command)
+    with _prefetching_lock:
+        if key in _prefetching:
+            return
+        future = _prefetch_executor.submit(contextvars.copy_context().run, _classify_intent_remotely, command)
+        _prefetching[key] = future
+
+    def done(_):
+        with _prefetching_lock:
+            _prefetching.pop(key, None)
+
+    future.add_done_callback(done)
+
+def classify_intent_remotely(command: str) -> str:
+    """Asks the intent LLM and caches the answer when it is a known label, "llm" when the request fails."""
+    with _prefetching_lock:
+        prefetched = _prefetching.get(normalize_command(command))
+    if prefetched is not None:
+        return prefetched.result()
+    return _classify_intent_remotely(command)
+
+def _classify_intent_remotely(command: str) -> str:
+    start_time = time.perf_counter()
+    intent = classify_intent_with_llm(command)
+    _record("llm", time.perf_counter() - start_time)
+
+    # A failed request falls back to chat for this turn only, the next one asks again
+    if intent is None:
+        return "llm"
+    # Unexpected LLM output is not worth remembering
+    if intent in local_classifier.labels:
+        intent_cache.set(normalize_command(command), intent)
+    return intent
+
+def classify_intent_with_llm(command: str):
+    """The intent LLM's answer, None when the request fails."""
     prompt_template = INTENT_CLASSIFICATION_PROMPT.strip()
-    prompt = prompt_template.format(command=command) 
+    prompt = prompt_template.format(command=command)
 
     messages = [
         {"role": "user", "content": prompt},
@@ -33,26 +211,21 @@ def classify_intent(command: str) -> str:
     if DEBUG_AI_RESPONSE == "true":
         print(f"🤖 Sending to intent AI: {payload}")
 
-    headers = {
-        "Authorization": f"Bearer {ANYTHING_LLM_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
     try:
-        response = requests.post(ANYTHING_LLM_API_CHAT_URL, headers=headers, data=json.dumps(payload))
+        response = http_client.post(ANYTHING_LLM_API_CHAT_URL, headers=INTENT_HEADERS, data=json.dumps(payload))
 
         # Handle empty or non-JSON responses
         if response.status_code != 200:
             print(f"❌ API Error: {response.status_code} - {response.text}")
-            return "llm"
+            return None
 
         try:
             json_response = response.json()
             return json_response["choices"][0]["message"]["content"].strip().lower()
         except json.JSONDecodeError:
             print(f"❌ JSON Decode Error: Response text = {response.text}")
-            return "llm"
+            return None
 
     except requests.exceptions.RequestException as e:
         print(f"❌ Request Error: {e}")
-        return "llm"
+        return None
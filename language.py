@@ -0,0 +1,85 @@
+import os
+import threading
+import contextlib
+import contextvars
+from dataclasses import dataclass
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FIRST_LANGUAGE_NAME = os.getenv("FIRST_LANGUAGE_NAME")
+FIRST_LANGUAGE_CODE = os.getenv("FIRST_LANGUAGE_CODE")
+SECOND_LANGUAGE_NAME = os.getenv("SECOND_LANGUAGE_NAME")
+SECOND_LANGUAGE_CODE = os.getenv("SECOND_LANGUAGE_CODE")
+SECOND_LANGUAGE_SPOKEN_CODE = os.getenv("SECOND_LANGUAGE_SPOKEN_CODE")
+
+@dataclass(frozen=True)
+class Language:
+    code: str
+    name: str
+    # Language code of the TTS voice, e.g. "zh-cn"
+    spoken: str
+
+FIRST_LANGUAGE = Language(FIRST_LANGUAGE_CODE, FIRST_LANGUAGE_NAME, FIRST_LANGUAGE_CODE)
+SECOND_LANGUAGE = Language(SECOND_LANGUAGE_CODE, SECOND_LANGUAGE_NAME, SECOND_LANGUAGE_SPOKEN_CODE)
+
+_identifier = None
+_identifier_lock = threading.Lock()
+
+def get_identifier():
+    """langid limited to the two configured languages, loaded once (its model takes about a second)."""
+    global _identifier
+    with _identifier_lock:
+        if _identifier is None:
+            from langid.langid import LanguageIdentifier, model
+
+            identifier = LanguageIdentifier.from_modelstring(model)
+            identifier.set_languages([code for code in (FIRST_LANGUAGE_CODE, SECOND_LANGUAGE_CODE) if code in identifier.nb_classes])
+            _identifier = identifier
+        return _identifier
+
+def from_code(code: str):
+    """The configured language with this code (e.g. Whisper's detection), None for any other."""
+    for language in (FIRST_LANGUAGE, SECOND_LANGUAGE):
+        if code and code == language.code:
+            return language
+    return None
+
+def identify(text: str) -> Language:
+    return SECOND_LANGUAGE if get_identifier().classify(text)[0] == SECOND_LANGUAGE_CODE else FIRST_LANGUAGE
+
+class TurnLanguage:
+    """The language of one turn, decided once: Whisper's detection if it is a configured
+    language, otherwise langid on the first text that needs it."""
+
+    def __init__(self, code: str = None):
+        self.language = from_code(code)
+        self.source = "whisper" if self.language else None
+        self.reported = False
+        self.lock = threading.Lock()
+
+    def resolve(self, text: str) -> Language:
+        with self.lock:
+            if self.language is None:
+                self.language = identify(text)
+                self.source = "langid"
+            if not self.reported:
+                print(f"🔍 Detected language: {self.language.code} ({self.source})")
+                self.reported = True
+            return self.language
+
+_turn = contextvars.ContextVar("turn_language", default=None)
+
+@contextlib.contextmanager
+def activate(turn: TurnLanguage):
+    """Makes `turn` the language every resolve() in this context, and contexts copied from it, agrees on."""
+    token = _turn.set(turn)
+    try:
+        yield turn
+    finally:
+        _turn.reset(token)
+
+def resolve(text: str) -> Language:
+    """The active turn's language, or the text's own language outside of a turn."""
+    turn = _turn.get()
+    return turn.resolve(text) if turn is not None else identify(text)
@@ -0,0 +1,173 @@
+import os
+import time
+import hashlib
+import threading
+import requests
+import http_client
+import sessions
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from token_count import estimate_tokens
+
+load_dotenv()
+
+AGENT_API_URL = os.getenv("AGENT_API_URL")
+AGENT_MODEL = os.getenv("AGENT_MODEL")
+
+# Tokens of earlier conversation (summary plus recent turns) sent with each chat request, 0 disables memory
+CHAT_MEMORY_TOKENS = int(os.getenv("CHAT_MEMORY_TOKENS", "1000"))
+# Most recent turns always kept word for word
+CHAT_MEMORY_KEEP_TURNS = int(os.getenv("CHAT_MEMORY_KEEP_TURNS", "2"))
+# Words the rolling summary of older turns is asked to fit in
+CHAT_MEMORY_SUMMARY_WORDS = int(os.getenv("CHAT_MEMORY_SUMMARY_WORDS", "120"))
+# Seconds without a turn after which the next one starts a new conversation
+CHAT_MEMORY_IDLE = float(os.getenv("CHAT_MEMORY_IDLE", "300"))
+
+SUMMARY_PROMPT = """Update the summary of a conversation between a user and an assistant with the new turns.
+Keep names, facts, decisions and open questions. Use at most {words} words. Output only the summary.
+
+Summary so far:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:"""
+
+@dataclass(frozen=True)
+class ChatTurn:
+    user: str
+    assistant: str
+    tokens: int
+
+def summarize_conversation(summary: str, turns: list) -> str:
+    """Folds turns into the rolling summary with the local agent model, None when it fails."""
+    text = "\n".join(f"User: {turn.user}\nAssistant: {turn.assistant}" for turn in turns)
+    prompt = SUMMARY_PROMPT.format(words=CHAT_MEMORY_SUMMARY_WORDS, summary=summary or "(empty)", turns=text)
+    try:
+        response = http_client.post(f"{AGENT_API_URL}/completions", json={"model": AGENT_MODEL, "prompt": prompt, "max_length": 500})
+        response.raise_for_status()
+        return response.json()["choices"][0]["text"].strip() or None
+    except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+        print(f"❌ Failed to summarize the conversation: {e}")
+        return None
+
+class ConversationMemory:
+    """Recent chat turns plus a rolling summary of older ones, within a token budget.
+
+    Requests are laid out as [system prompt + summary, turn, ..., turn, command] so each
+    one extends the previous byte for byte, and the LLM server's prefix (KV) cache only
+    recomputes the newest turn. When the turns outgrow the budget, the oldest are folded
+    into the summary on a background thread, down to half the budget, so the prefix
+    changes only once every few turns.
+    """
+
+    def __init__(self, budget: int = CHAT_MEMORY_TOKENS, keep_turns: int = CHAT_MEMORY_KEEP_TURNS,
+                 idle_timeout: float = CHAT_MEMORY_IDLE, summarize=summarize_conversation):
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.idle_timeout = idle_timeout
+        self.summarize = summarize
+        self.summary = ""
+        self.turns = []
+        self.compactions = 0
+        self.last_turn_at = time.monotonic()
+        self.compacting = None
+        self.lock = threading.Lock()
+
+    def _expire_idle(self):
+        if self.idle_timeout and time.monotonic() - self.last_turn_at > self.idle_timeout:
+            self.summary = ""
+            self.turns = []
+
+    def system_prompt(self, base: str) -> str:
+        with self.lock:
+            self._expire_idle()
+            if not self.summary:
+                return base
+            return f"{base}\n\nSummary of the conversation so far: {self.summary}"
+
+    def messages(self, system_prompt: str, command: str) -> list:
+        """The chat messages for the command: system prompt with the summary, recent turns, command."""
+        system = self.system_prompt(system_prompt)
+        with self.lock:
+            turns = list(self.turns)
+        # A compaction that is late or failing must not let requests grow without bound
+        while len(turns) > 1 and sum(turn.tokens for turn in turns) > 2 * self.budget:
+            turns.pop(0)
+
+        messages = [{"role": "system", "content": system}]
+        for turn in turns:
+            messages.append({"role": "user", "content": turn.user})
+            messages.append({"role": "assistant", "content": turn.assistant})
+        messages.append({"role": "user", "content": command})
+        return messages
+
+    def fingerprint(self) -> str:
+        """Identifies the conversation so far, empty for a new conversation."""
+        with self.lock:
+            self._expire_idle()
+            if not self.summary and not self.turns:
+                return ""
+            text = "\0".join([self.summary] + [f"{turn.user}\0{turn.assistant}" for turn in self.turns])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    def record(self, command: str, response: str):
+        """Adds a finished turn, starting a background compaction when over the budget."""
+        if self.budget <= 0 or not response:
+            return
+        with self.lock:
+            self._expire_idle()
+            self.last_turn_at = time.monotonic()
+            self.turns.append(ChatTurn(command, response, estimate_tokens(command) + estimate_tokens(response)))
+            if self.compacting is None and self._history_tokens() > self.budget and len(self.turns) > self.keep_turns:
+                self.compacting = threading.Thread(target=self._compact, name="chat-memory", daemon=True)
+                self.compacting.start()
+
+    def _history_tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(turn.tokens for turn in self.turns)
+
+    def _compact(self):
+        with self.lock:
+            summary = self.summary
+            count = 0
+            remaining = sum(turn.tokens for turn in self.turns)
+            # Oldest first, down to half the budget so the next compaction is several turns away
+            while len(self.turns) - count > self.keep_turns and remaining > self.budget // 2:
+                remaining -= self.turns[count].tokens
+                count += 1
+            old_turns = self.turns[:count]
+
+        new_summary = self.summarize(summary, old_turns) if old_turns else summary
+        with self.lock:
+            if new_summary is None:
+                # Keep the budget anyway, the turns are lost rather than resent forever
+                print(f"⚠️ Dropping {count} turns from the conversation memory.")
+                new_summary = summary
+            # Turns recorded meanwhile stay, unless the conversation expired and started over
+            if self.turns[:count] == old_turns:
+                self.summary = new_summary
+                self.turns = self.turns[count:]
+                self.compactions += 1
+            self.compacting = None
+
+    def wait(self):
+        """Waits for a running compaction, e.g. in benchmarks."""
+        compacting = self.compacting
+        if compacting is not None:
+            compacting.join()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"turns": len(self.turns), "summary_tokens": estimate_tokens(self.summary) if self.summary else 0,
+                    "history_tokens": self._history_tokens(), "compactions": self.compactions}
+
+def current() -> ConversationMemory:
+    """The conversation of the current session (the local one outside of server mode)."""
+    session = sessions.current()
+    with session.lock:
+        memory = session.get("conversation")
+        if memory is None:
+            memory = ConversationMemory()
+            session.set("conversation", memory)
+        return memory
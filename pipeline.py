@@ -0,0 +1,332 @@
+import math
+import time
+import queue
+import collections
+import threading
+import tracing
+from dataclasses import dataclass, field
+from audio_buffer import RingBuffer, UtteranceBuffer
+from endpointing import AdaptiveEndpointer
+from chat import detect_spoken_language, synthesize_speech
+from dispatcher import dispatch_turn
+
+# SpeechItem payload marking the end of a turn, never dropped on barge-in
+END_OF_TURN = object()
+
+@dataclass
+class Turn:
+    audio: object
+    stream: object = None
+    command: str = ""
+    language: str = None
+    started_at: float = field(default_factory=time.time)
+    trace: object = tracing.NULL_TRACE
+
+@dataclass
+class SpeechItem:
+    generation: int
+    payload: object
+    lang: str = None
+    trace: object = tracing.NULL_TRACE
+
+class QueuedSpeaker:
+    """Speaker for dispatch_turn that hands sentences to the TTS stage instead of playing them."""
+
+    def __init__(self, pipeline: "VoicePipeline", trace=tracing.NULL_TRACE):
+        self.pipeline = pipeline
+        self.generation = pipeline.generation
+        self.trace = trace
+        self.lang = None
+
+    def interrupted(self) -> bool:
+        return self.generation != self.pipeline.generation
+
+    def say(self, text: str):
+        self.say_sentences([text])
+
+    def say_sentences(self, sentences) -> str:
+        spoken = []
+        for sentence in sentences:
+            # Barge-in: stop consuming, which also closes a streamed chat response
+            if self.interrupted():
+                break
+            if self.lang is None:
+                self.lang = detect_spoken_language(sentence)
+                print(f"🎤 Speaking AI response in {self.lang}...")
+            spoken.append(sentence)
+            self.pipeline.tts_queue.put(SpeechItem(self.generation, sentence, self.lang, self.trace))
+        return " ".join(spoken)
+
+    def announce(self, text: str):
+        """A background agent's result, spoken whenever it arrives unless a later barge-in drops it."""
+        print(f"🔔 {text}")
+        self.pipeline.tts_queue.put(SpeechItem(self.pipeline.generation, text, detect_spoken_language(text)))
+
+class VoicePipeline:
+    """Capture, endpointing, ASR, dispatch, TTS and playback running as concurrent stages.
+
+    The capture thread only copies audio into a ring buffer so it never falls
+    behind; the wake word detector and endpointing both read their chunks from
+    it, so the microphone is opened once and nothing said right after the wake
+    word is lost. Endpointing runs on the calling thread and hands finished utterances
+    to the ASR worker. ASR, dispatch, synthesis and playback workers are joined
+    by bounded queues, so the next utterance can be captured while the previous
+    response is still being generated or spoken. With barge_in_frames set, speech
+    detected during playback interrupts it (barge-in); otherwise the microphone is
+    ignored while the assistant speaks.
+    """
+
+    def __init__(self, read_chunk, wait_for_wake_word, vad, transcribe, player,
+                 on_timeout=None, on_empty_transcript=None, rate: int = 16000, chunk: int = 512,
+                 silence_frames: int = 20, timeout_seconds: float = 15, barge_in_frames: int = 0,
+                 queue_size: int = 2, streaming_asr=None, pre_roll_seconds: float = 0.5, prefetch_intent=None):
+        self.read_chunk = read_chunk
+        self.wait_for_wake_word = wait_for_wake_word
+        self.vad = vad
+        self.transcribe = transcribe
+        self.player = player
+        self.on_timeout = on_timeout
+        self.on_empty_transcript = on_empty_transcript
+        self.rate = rate
+        self.chunk = chunk
+        self.silence_frames = silence_frames
+        # Ends an utterance after silence_frames quiet chunks, or fewer when it clearly ended
+        self.endpointer = AdaptiveEndpointer(silence_frames, rate=rate, chunk=chunk)
+        self.timeout_seconds = timeout_seconds
+        self.barge_in_frames = barge_in_frames
+        # Optional factory for a StreamingTranscriber, started at the first speech chunk
+        self.streaming_asr = streaming_asr
+        # Optional prefetch_intent(text), given the partial transcript once the speaker pauses
+        self.prefetch_intent = prefetch_intent
+        # Chunks before the first speech chunk that are kept at the start of the utterance
+        self.pre_roll_chunks = math.ceil(pre_roll_seconds * rate / chunk)
+
+        self.ring = RingBuffer(rate=rate)
+        self.utterance = UtteranceBuffer(rate=rate)
+        self.asr_queue = queue.Queue(maxsize=queue_size)
+        self.dispatch_queue = queue.Queue(maxsize=queue_size)
+        self.tts_queue = queue.Queue(maxsize=queue_size * 4)
+        self.audio_queue = queue.Queue(maxsize=queue_size)
+
+        # Bumped on barge-in, speech queued under an older generation is dropped
+        self.generation = 0
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for target, name in ((self._capture_worker, "capture"), (self._asr_worker, "asr"),
+                             (self._dispatch_worker, "dispatch"), (self._tts_worker, "tts"),
+                             (self._playback_worker, "playback")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopped.set()
+        self.ring.close()
+        self.player.stop()
+
+    def busy(self) -> bool:
+        with self._in_flight_lock:
+            return self.in_flight > 0
+
+    def _turn_started(self):
+        with self._in_flight_lock:
+            self.in_flight += 1
+
+    def _turn_finished(self):
+        with self._in_flight_lock:
+            self.in_flight -= 1
+
+    def barge_in(self):
+        print("✋ Barge-in, stopping playback.")
+        self.generation += 1
+        self.player.stop()
+
+    def run(self):
+        """Wake word, then listening sessions until stopped. Blocks the calling thread."""
+        self.start()
+        while not self._stopped.is_set():
+            if self.wait_for_wake_word(self.read_frame):
+                self.listen()
+
+    def read_frame(self):
+        """The next chunk from the capture ring, for the wake word detector; None once stopped."""
+        while not self._stopped.is_set():
+            frame = self.ring.read(self.chunk, timeout=0.5)
+            if frame is not None:
+                return frame
+        return None
+
+    def listen(self):
+        """One listening session: endpoint utterances until TIMEOUT_SECONDS without speech."""
+        print("🎤 Listening for speech...")
+        # The wake word was detected just before the session started
+        wake_time = time.perf_counter()
+
+        # The ring continues right after the wake word's frame, only the VAD starts over
+        self.vad.reset()
+        # Audio just before speech onset, which the VAD needs a chunk or more to notice
+        pre_roll = collections.deque(maxlen=self.pre_roll_chunks)
+
+        utterance = self.utterance
+        utterance.clear()
+        recording = False
+        stream = None
+        trace = tracing.NULL_TRACE
+        prefetched = ""
+        silence_frames = 0
+        speech_run = 0
+        last_speech_time = time.time()
+        last_speech = time.perf_counter()
+
+        while not self._stopped.is_set():
+            audio_chunk = self.ring.read(self.chunk, timeout=0.5)
+
+            # Earcons, and the assistant's voice when barge-in is off, must not become an utterance.
+            # Nor may they reach the pre-roll: Whisper turns a beep at the start of the audio into words.
+            if audio_chunk is not None and (self.player.earcon_playing() or
+                                            (not self.barge_in_frames and self.player.is_playing())):
+                audio_chunk = None
+
+            if audio_chunk is not None:
+                is_speaking = self.vad.is_speech(audio_chunk)
+
+                if is_speaking:
+                    speech_run += 1
+                    if self.barge_in_frames and speech_run == self.barge_in_frames and self.player.is_playing():
+                        self.barge_in()
+
+                    if not recording:
+                        print("🎙️ Speech detected, recording...")
+                        recording = True
+                        utterance.clear()
+                        trace = tracing.start_turn("voice")
+                        trace.mark("speech_start")
+                        # Only the first utterance of a session follows the wake word
+                        if wake_time is not None:
+                            trace.mark("wake", at=wake_time)
+                            wake_time = None
+                        stream = self.streaming_asr() if self.streaming_asr else None
+                        for earlier_chunk in pre_roll:
+                            utterance.append(earlier_chunk)
+                            if stream:
+                                stream.feed(earlier_chunk)
+                        pre_roll.clear()
+
+                    utterance.append(audio_chunk)
+                    if stream:
+                        stream.feed(audio_chunk)
+                    silence_frames = 0
+                    self.endpointer.reset()
+                    last_speech_time = time.time()
+                    last_speech = time.perf_counter()
+
+                else:
+                    speech_run = 0
+                    if recording:
+                        silence_frames += 1
+                        self.endpointer.observe_silence(getattr(self.vad, "last_votes", None))
+                        # A pass over everything said so far, for the endpointer to read the partial transcript;
+                        # the stream skips it while a pass is running and tries again at the next quiet chunk
+                        if stream and not stream.current_text():
+                            stream.nudge()
+                    else:
+                        pre_roll.append(audio_chunk)
+
+                partial = stream.current_text() if stream and silence_frames else ""
+                # Most likely the final transcript: classify it while the endpointer is still waiting
+                if partial and partial != prefetched and self.prefetch_intent:
+                    self.prefetch_intent(partial)
+                    prefetched = partial
+                if recording and (self.endpointer.is_endpoint(silence_frames, partial) or utterance.is_full()):
+                    print(f"⏸️ Silence detected after {silence_frames * self.chunk * 1000 // self.rate} ms, stopping recording.")
+                    trace.mark("last_speech", at=last_speech)
+                    trace.mark("endpoint")
+
+                    # The buffer is reused for the next utterance, ASR gets its own copy
+                    self._turn_started()
+                    if stream:
+                        self.asr_queue.put(Turn(audio=None, stream=stream, trace=trace))
+                    else:
+                        self.asr_queue.put(Turn(audio=utterance.to_float32().copy(), trace=trace))
+                    utterance.clear()
+                    recording = False
+                    silence_frames = 0
+
+            # A turn still being answered keeps the session open
+            if self.busy():
+                last_speech_time = time.time()
+            elif not recording and time.time() - last_speech_time > self.timeout_seconds:
+                print("⏳ Timeout: No speech detected after wake word.")
+                if self.on_timeout:
+                    self.on_timeout()
+                return
+
+    def _capture_worker(self):
+        while not self._stopped.is_set():
+            self.ring.write(self.read_chunk())
+
+    def _asr_worker(self):
+        while True:
+            turn = self.asr_queue.get()
+            print("🔄 Transcribing...")
+            start_time = time.time()
+            try:
+                # Streaming ASR has already committed most of the words, only the tail is left
+                with turn.trace.span("asr"):
+                    if turn.stream:
+                        turn.command = turn.stream.finish()
+                    else:
+                        # An asr.Transcript, its language decides the turn's without another detection
+                        transcript = self.transcribe(turn.audio)
+                        turn.command, turn.language = transcript.text, transcript.language
+            except Exception as e:
+                print(f"❌ Transcription error: {e}")
+            print(f"⏱️ Transcription took {time.time() - start_time:.2f} seconds.")
+
+            if turn.command:
+                print(f"📝 Transcription: {turn.command}")
+                self.dispatch_queue.put(turn)
+            else:
+                print("❌ Transcription failed: Empty result.")
+                if self.on_empty_transcript:
+                    self.on_empty_transcript()
+                turn.trace.finish()
+                self._turn_finished()
+
+    def _dispatch_worker(self):
+        while True:
+            turn = self.dispatch_queue.get()
+            try:
+                with tracing.activate(turn.trace):
+                    dispatch_turn(turn.command, speaker=QueuedSpeaker(self, turn.trace), language_code=turn.language)
+            except Exception as e:
+                print(f"❌ Failed to dispatch command: {e}")
+            finally:
+                self.tts_queue.put(SpeechItem(self.generation, END_OF_TURN, trace=turn.trace))
+
+    def _tts_worker(self):
+        while True:
+            item = self.tts_queue.get()
+            if item.payload is END_OF_TURN:
+                self.audio_queue.put(item)
+            elif item.generation == self.generation:
+                try:
+                    with tracing.activate(item.trace):
+                        speech = synthesize_speech(item.payload, item.lang)
+                    self.audio_queue.put(SpeechItem(item.generation, speech, trace=item.trace))
+                except Exception as e:
+                    print(f"❌ Failed to generate speech: {e}")
+
+    def _playback_worker(self):
+        while True:
+            item = self.audio_queue.get()
+            if item.payload is END_OF_TURN:
+                item.trace.finish()
+                self._turn_finished()
+            elif item.generation == self.generation:
+                item.trace.mark("first_audio")
+                self.player.play(item.payload)
@@ -0,0 +1,210 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import requests
+import numpy as np
+import http_client
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from cache import LRUCache
+
+load_dotenv()
+
+ANYTHING_LLM_API_URL = os.getenv("ANYTHING_LLM_API_URL")
+ANYTHING_LLM_API_KEY = os.getenv("ANYTHING_LLM_API_KEY")
+
+# Chat answers kept, 0 (the default) disables the cache
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "0"))
+# Seconds an answer is reused for
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+# Cosine similarity for reusing the answer to a differently worded question, 0 matches exact commands only
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+# OpenAI-compatible embeddings endpoint, AnythingLLM's uses the embedder configured for RAG
+RESPONSE_CACHE_EMBEDDING_URL = os.getenv("RESPONSE_CACHE_EMBEDDING_URL", f"{ANYTHING_LLM_API_URL}/v1/openai/embeddings")
+RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "")
+# Seconds between checks of the chat workspace's documents and settings, 0 disables
+RESPONSE_CACHE_WORKSPACE_CHECK = float(os.getenv("RESPONSE_CACHE_WORKSPACE_CHECK", "60"))
+# Questions whose answer changes with time are never cached, matched against the normalized command
+RESPONSE_CACHE_SKIP = os.getenv("RESPONSE_CACHE_SKIP", r"\b(time|now|today|tonight|tomorrow|yesterday|date|weather|forecast|"
+                                r"temperature|news|latest|current|currently|price|score|this (week|month|year))\b|"
+                                r"现在|今天|明天|昨天|时间|几点|日期|天气|新闻|最新")
+
+HEADERS = {
+    "Authorization": f"Bearer {ANYTHING_LLM_API_KEY}",
+    "Content-Type": "application/json"
+}
+
+# Workspace settings that change what the chat answers, besides its documents
+WORKSPACE_FIELDS = ("documents", "openAiPrompt", "openAiTemp", "similarityThreshold", "topN",
+                    "chatProvider", "chatModel", "vectorSearchMode")
+
+def normalize_query(command: str) -> str:
+    """Lowercase without punctuation, so "What's your name?" and "what's your name" share an answer."""
+    return " ".join(re.sub(r"[^\w\s]", " ", command.lower()).split())
+
+@dataclass
+class Lookup:
+    """A cache lookup, kept so a miss can be stored under the same key and embedding."""
+    key: tuple
+    vector: np.ndarray = None
+    response: str = None
+    # False for questions matching RESPONSE_CACHE_SKIP
+    cacheable: bool = True
+
+class ResponseCache(LRUCache):
+    """Chat answers keyed by (workspace, language, system prompt, conversation, normalized command).
+
+    With a similarity threshold and an `embed` function, a miss falls back to the
+    most similar cached command asked with the same workspace, language, prompt and conversation.
+    Commands matching `skip` (e.g. "what time is it") are neither looked up nor stored.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY, embed=None, skip: str = RESPONSE_CACHE_SKIP):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.skip = re.compile(skip) if skip else None
+        self.skipped = 0
+        self.similarity = similarity
+        self.embed = embed if similarity > 0 else None
+        self.approximate_hits = 0
+
+    def lookup(self, key: tuple) -> Lookup:
+        if self.maxsize <= 0:
+            return Lookup(key, cacheable=False)
+        if self.skip is not None and self.skip.search(key[-1]):
+            with self._lock:
+                self.skipped += 1
+            return Lookup(key, cacheable=False)
+        entry = self.get(key)
+        if entry is not None:
+            return Lookup(key, entry[1], entry[0])
+        if self.embed is None:
+            return Lookup(key)
+
+        vector = self.embed(key[-1])
+        if vector is None:
+            return Lookup(key)
+        with self._lock:
+            nearest = self._nearest(key, vector)
+            if nearest is None:
+                return Lookup(key, vector)
+            self._entries.move_to_end(nearest)
+            self.approximate_hits += 1
+            return Lookup(key, vector, self._entries[nearest][0][0])
+
+    def _nearest(self, key: tuple, vector: np.ndarray):
+        best_key, best_score = None, self.similarity
+        now = time.monotonic()
+        for cached_key, ((_, cached_vector), expires_at) in self._entries.items():
+            if cached_vector is None or cached_key[:-1] != key[:-1] or (expires_at is not None and expires_at <= now):
+                continue
+            score = float(np.dot(vector, cached_vector))
+            if score >= best_score:
+                best_key, best_score = cached_key, score
+        return best_key
+
+    def store(self, lookup: Lookup, response: str):
+        if self.maxsize > 0 and lookup.cacheable and response:
+            vector = lookup.vector
+            if vector is None and self.embed is not None:
+                vector = self.embed(lookup.key[-1])
+            self.set(lookup.key, (response, vector))
+
+    def invalidate_workspace(self, workspace: str) -> int:
+        """Drops every answer from the workspace, returns how many."""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == workspace]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["approximate_hits"] = self.approximate_hits
+        stats["skipped"] = self.skipped
+        return stats
+
+def embed_text(text: str):
+    """Unit-length embedding of the text, None when the embeddings endpoint fails."""
+    payload = {"input": text}
+    if RESPONSE_CACHE_EMBEDDING_MODEL:
+        payload["model"] = RESPONSE_CACHE_EMBEDDING_MODEL
+    try:
+        response = http_client.post(RESPONSE_CACHE_EMBEDDING_URL, headers=HEADERS, data=json.dumps(payload))
+        response.raise_for_status()
+        vector = np.asarray(response.json()["data"][0]["embedding"], dtype=np.float32)
+    except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+        print(f"❌ Embedding failed, exact cache matches only: {e}")
+        return None
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+def workspace_fingerprint(workspace: str):
+    """Hash of the workspace's documents and answer settings, None when AnythingLLM can't be reached."""
+    try:
+        response = http_client.get(f"{ANYTHING_LLM_API_URL}/v1/workspace/{workspace}", headers=HEADERS)
+        response.raise_for_status()
+        data = response.json()["workspace"]
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        print(f"❌ Failed to check workspace {workspace}: {e}")
+        return None
+    # Returned as a list of one workspace by some AnythingLLM versions
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    settings = {field: data.get(field) for field in WORKSPACE_FIELDS}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class WorkspaceWatcher:
+    """Invalidates a workspace's cached answers when its documents or settings change."""
+
+    def __init__(self, cache: ResponseCache, workspace: str, interval: float = RESPONSE_CACHE_WORKSPACE_CHECK):
+        self.cache = cache
+        self.workspace = workspace
+        self.interval = interval
+        self.fingerprint = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="workspace-watcher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def check(self):
+        fingerprint = workspace_fingerprint(self.workspace)
+        if fingerprint is None:
+            return
+        if self.fingerprint is not None and fingerprint != self.fingerprint:
+            count = self.cache.invalidate_workspace(self.workspace)
+            print(f"💾 Workspace {self.workspace} changed, dropped {count} cached responses.")
+        self.fingerprint = fingerprint
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.check()
+            self.stopped.wait(self.interval)
+
+response_cache = ResponseCache(embed=embed_text)
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+def watch_workspace(workspace: str):
+    """Starts checking the workspace for changes, once per workspace."""
+    if RESPONSE_CACHE_SIZE <= 0 or RESPONSE_CACHE_WORKSPACE_CHECK <= 0:
+        return
+    with _watchers_lock:
+        if workspace not in _watchers:
+            _watchers[workspace] = WorkspaceWatcher(response_cache, workspace).start()
+
+def invalidate(workspace: str = None) -> int:
+    """Drops the workspace's cached answers, or all of them; call after uploading documents."""
+    if workspace is not None:
+        return response_cache.invalidate_workspace(workspace)
+    count = len(response_cache)
+    response_cache.invalidate()
+    return count
@@ -0,0 +1,313 @@
+import os
+import json
+import wave
+import asyncio
+import threading
+import contextlib
+import numpy as np
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+import sessions
+import tracing
+import response_cache
+from asr import create_asr
+from audio_buffer import UtteranceBuffer
+from vad import VadFrontEnd
+from endpointing import AdaptiveEndpointer
+from chat import detect_spoken_language, synthesize_speech
+from dispatcher import dispatch_turn
+from agents.agent_manager import cancel_agents, get_agent_stats
+from startup import start_server_loading
+
+load_dotenv()
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_HTTP_PORT = int(os.getenv("SERVER_HTTP_PORT", "8765"))
+SERVER_WS_PORT = int(os.getenv("SERVER_WS_PORT", "8766"))
+# Longest utterance a WebSocket client can send before it is cut, sizes each session's buffer
+SERVER_MAX_UTTERANCE_SECONDS = float(os.getenv("SERVER_MAX_UTTERANCE_SECONDS", "15"))
+
+# Same audio format and endpointing as the voice loop
+RATE = 16000
+CHUNK = 512
+VAD_MODE = 2
+VAD_FRAME_MS = 10
+SILENCE_FRAMES = 20
+
+# One Whisper model, langid and the agents for every client; no wake word or microphone
+loader = start_server_loading()
+asr = create_asr(lambda: loader.get("whisper"))
+store = sessions.SessionStore()
+
+def decode_audio(body: bytes) -> np.ndarray:
+    """A 16 kHz mono 16-bit WAV, or the same as raw PCM, as float32 samples."""
+    if body[:4] == b"RIFF":
+        with wave.open(BytesIO(body), "rb") as wf:
+            if wf.getframerate() != RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                raise ValueError("expected 16 kHz mono 16-bit PCM")
+            body = wf.readframes(wf.getnframes())
+    return np.frombuffer(body[:len(body) // 2 * 2], dtype=np.int16).astype(np.float32) / 32768.0
+
+def run_turn(session: sessions.Session, audio: np.ndarray = None, command: str = None, speaker=None) -> dict:
+    """Transcribes (for audio) and dispatches one turn in the session's context.
+
+    Turns of one session run one after another, whether they come over HTTP or a WebSocket.
+    """
+    with session.turn_lock:
+        trace = tracing.TurnTrace("server")
+        result = {}
+        with sessions.activate(session), tracing.activate(trace):
+            language_code = None
+            if audio is not None:
+                with trace.span("asr"):
+                    transcript = asr.transcribe(audio)
+                command, language_code = transcript.text, transcript.language
+                result["transcript"] = command
+                if speaker:
+                    speaker.send({"type": "transcript", "text": command})
+            if command:
+                result["intent"], result["response"] = dispatch_turn(command, speaker=speaker, language_code=language_code)
+    result["timings"] = {name: round(seconds, 4) for name, seconds in trace.latencies().items()}
+    if tracing.TRACE_ENABLED:
+        trace.finish()
+    return result
+
+class Endpointer:
+    """The voice loop's endpointing rule over a client's stream of PCM bytes of any size."""
+
+    def __init__(self):
+        self.vad = VadFrontEnd(rate=RATE, mode=VAD_MODE, frame_ms=VAD_FRAME_MS)
+        self.endpointer = AdaptiveEndpointer(SILENCE_FRAMES, rate=RATE, chunk=CHUNK)
+        self.utterance = UtteranceBuffer(rate=RATE, max_seconds=SERVER_MAX_UTTERANCE_SECONDS)
+        self.pending = b""
+        self.recording = False
+        self.silence_frames = 0
+
+    def feed(self, data: bytes) -> list:
+        """Returns the utterances this data completed, as float32 samples."""
+        self.pending += data
+        step = CHUNK * 2
+        utterances = []
+        while len(self.pending) >= step:
+            frame, self.pending = self.pending[:step], self.pending[step:]
+
+            if self.vad.is_speech(frame):
+                if not self.recording:
+                    self.recording = True
+                    self.utterance.clear()
+                self.utterance.append(frame)
+                self.silence_frames = 0
+                self.endpointer.reset()
+            elif self.recording:
+                self.silence_frames += 1
+                self.endpointer.observe_silence(self.vad.last_votes)
+
+            if self.recording and (self.endpointer.is_endpoint(self.silence_frames) or self.utterance.is_full()):
+                utterances.append(self.utterance.to_float32().copy())
+                self.recording = False
+                self.silence_frames = 0
+        return utterances
+
+class WebSocketSpeaker:
+    """Speaker for dispatch_turn that sends sentences, and optionally their audio, to one client.
+
+    Called from a worker thread, every send is handed to the event loop and waited for.
+    """
+
+    def __init__(self, websocket, loop: asyncio.AbstractEventLoop, speak: bool = False):
+        self.websocket = websocket
+        self.loop = loop
+        self.speak = speak
+        self.closed = False
+
+    def send(self, message):
+        if self.closed:
+            return
+        data = message if isinstance(message, bytes) else json.dumps(message, ensure_ascii=False)
+        try:
+            asyncio.run_coroutine_threadsafe(self.websocket.send(data), self.loop).result()
+        except Exception:
+            # The client is gone: stop sending, which also stops consuming a streamed response
+            self.closed = True
+
+    def say(self, text: str):
+        self.say_sentences([text])
+
+    def send_speech(self, text: str, lang: str):
+        speech = synthesize_speech(text, lang)
+        self.send({"type": "audio", "rate": speech.rate, "bytes": len(speech.pcm)})
+        self.send(speech.pcm)
+
+    def say_sentences(self, sentences) -> str:
+        spoken = []
+        lang = None
+        for sentence in sentences:
+            if self.closed:
+                break
+            spoken.append(sentence)
+            self.send({"type": "sentence", "text": sentence})
+            if self.speak:
+                lang = lang or detect_spoken_language(sentence)
+                self.send_speech(sentence, lang)
+        return " ".join(spoken)
+
+    def announce(self, text: str):
+        """A background agent's result, after the turn's response."""
+        self.send({"type": "announcement", "text": text})
+        if self.speak and not self.closed:
+            self.send_speech(text, detect_spoken_language(text))
+
+async def run_websocket_turn(websocket, session: sessions.Session, lock: asyncio.Lock, speak: bool,
+                             audio: np.ndarray = None, command: str = None):
+    # A session's turns are answered in order, different sessions run concurrently
+    async with lock:
+        speaker = WebSocketSpeaker(websocket, asyncio.get_running_loop(), speak)
+        try:
+            result = await asyncio.to_thread(run_turn, session, audio, command, speaker)
+            await websocket.send(json.dumps({"type": "response", **result}, ensure_ascii=False))
+        except Exception as e:
+            print(f"❌ Session {session.session_id}: {e}")
+            with contextlib.suppress(Exception):
+                await websocket.send(json.dumps({"type": "error", "error": str(e)}))
+
+async def handle_websocket(websocket):
+    """Binary frames are 16 kHz mono int16 audio, text frames are JSON: {"type": "text", "command": ...}
+    or {"type": "config", "speak": true} to also receive synthesized speech."""
+    session = store.create()
+    endpointer = Endpointer()
+    lock = asyncio.Lock()
+    speak = False
+    tasks = set()
+    print(f"🔌 Session {session.session_id} connected ({len(store)} open).")
+
+    def start(**turn):
+        task = asyncio.create_task(run_websocket_turn(websocket, session, lock, speak, **turn))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    try:
+        await websocket.send(json.dumps({"type": "session", "session_id": session.session_id}))
+        async for message in websocket:
+            session.touch()
+            if isinstance(message, bytes):
+                for audio in endpointer.feed(message):
+                    await websocket.send(json.dumps({"type": "endpoint", "seconds": round(len(audio) / RATE, 2)}))
+                    start(audio=audio)
+                continue
+
+            try:
+                data = json.loads(message)
+            except json.JSONDecodeError:
+                await websocket.send(json.dumps({"type": "error", "error": "expected JSON"}))
+                continue
+            if data.get("type") == "config":
+                speak = bool(data.get("speak", speak))
+            elif data.get("type") == "text" and data.get("command"):
+                start(command=data["command"])
+    except Exception as e:
+        print(f"❌ Session {session.session_id}: {e}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        cancel_agents(session.session_id)
+        store.close(session.session_id)
+        print(f"🔌 Session {session.session_id} closed.")
+
+class ServerHandler(BaseHTTPRequestHandler):
+    """POST /sessions, DELETE /sessions/<id>, POST /sessions/<id>/text with {"command": ...},
+    POST /sessions/<id>/audio with a WAV or raw 16 kHz mono int16 body, GET /health,
+    DELETE /cache[/<workspace>] to drop cached chat answers."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, data: dict):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok", "sessions": len(store), "models": loader.status(), "errors": loader.errors(),
+                                 "agents": get_agent_stats()})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["sessions"]:
+            self.send_json(200, {"session_id": store.create().session_id})
+            return
+        if len(parts) != 3 or parts[0] != "sessions" or parts[2] not in ("text", "audio"):
+            self.send_json(404, {"error": "not found"})
+            return
+
+        session = store.get(parts[1])
+        if session is None:
+            self.send_json(404, {"error": "unknown session"})
+            return
+
+        try:
+            body = self.read_body()
+            if parts[2] == "text":
+                data = json.loads(body)
+                command = data.get("command") if isinstance(data, dict) else None
+                if not isinstance(command, str) or not command.strip():
+                    raise ValueError("expected a JSON object with a command")
+                command = command.strip()
+                self.send_json(200, run_turn(session, command=command))
+            else:
+                self.send_json(200, run_turn(session, audio=decode_audio(body)))
+        except (ValueError, wave.Error) as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            print(f"❌ Session {session.session_id}: {e}")
+            self.send_json(503, {"error": str(e)})
+
+    def do_DELETE(self):
+        parts = self.path.strip("/").split("/")
+        if parts[0] == "cache" and len(parts) <= 2:
+            # e.g. after uploading documents to the RAG workspace
+            self.send_json(200, {"invalidated": response_cache.invalidate(parts[1] if len(parts) == 2 else None)})
+        elif len(parts) == 2 and parts[0] == "sessions" and store.close(parts[1]):
+            cancel_agents(parts[1])
+            self.send_json(200, {"closed": parts[1]})
+        else:
+            self.send_json(404, {"error": "unknown session"})
+
+async def serve_websockets(websockets):
+    async with websockets.serve(handle_websocket, SERVER_HOST, SERVER_WS_PORT, max_size=2 ** 22):
+        print(f"🌐 WebSocket on ws://{SERVER_HOST}:{SERVER_WS_PORT}")
+        await asyncio.Future()
+
+def main():
+    # Keep langid's model load out of the first turns, Whisper keeps loading in the background
+    loader.get("langid")
+
+    http_server = ThreadingHTTPServer((SERVER_HOST, SERVER_HTTP_PORT), ServerHandler)
+    http_server.daemon_threads = True
+    print(f"🌐 HTTP on http://{SERVER_HOST}:{SERVER_HTTP_PORT}")
+
+    try:
+        import websockets
+    except ImportError:
+        print("⚠️ websockets is not installed, serving HTTP only.")
+        http_server.serve_forever()
+        return
+
+    threading.Thread(target=http_server.serve_forever, name="http", daemon=True).start()
+    asyncio.run(serve_websockets(websockets))
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n🛑 Exiting...")
+        exit(0)
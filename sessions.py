@@ -0,0 +1,88 @@
+import os
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Seconds a server session may stay idle before it is dropped
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "1800"))
+
+class Session:
+    """Per-client state, such as the lights, guarded by the session's own lock."""
+
+    def __init__(self, session_id: str = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        self.state = {}
+        self.lock = threading.RLock()
+        # Held for a whole turn: the session's turns read and extend its conversation one at a time
+        self.turn_lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self.lock:
+            return self.state.get(key, default)
+
+    def set(self, key: str, value):
+        with self.lock:
+            self.state[key] = value
+
+    def touch(self):
+        self.last_seen = time.time()
+
+class SessionStore:
+    """Sessions by id, idle ones are dropped when the store is next used."""
+
+    def __init__(self, idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self) -> Session:
+        session = Session()
+        with self._lock:
+            self._expire()
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str):
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+        if session:
+            session.touch()
+        return session
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        cutoff = time.time() - self.idle_timeout
+        for session_id in [sid for sid, session in self._sessions.items() if session.last_seen < cutoff]:
+            del self._sessions[session_id]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+# The voice loop and the console are one user, they share this session
+LOCAL_SESSION = Session("local")
+
+_current = contextvars.ContextVar("session", default=LOCAL_SESSION)
+
+def current() -> Session:
+    return _current.get()
+
+@contextmanager
+def activate(session: Session):
+    """Makes `session` the current one for agents running in this thread or task."""
+    token = _current.set(session)
+    try:
+        yield session
+    finally:
+        _current.reset(token)
@@ -0,0 +1,129 @@
+import os
+import time
+import warnings
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PORCUPINE_ACCESS_KEY = os.getenv("PORCUPINE_ACCESS_KEY")
+PORCUPINE_WAKE_WORD = os.getenv("PORCUPINE_WAKE_WORD")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL")
+# Print every audio device PyAudio finds when it starts
+DEBUG_AUDIO_DEVICES = os.getenv("DEBUG_AUDIO_DEVICES", "false").lower() == "true"
+
+RATE = 16000
+
+# Suppress warnings
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+warnings.filterwarnings("ignore", message="You are using `torch.load` with `weights_only=False`")
+
+class BackgroundLoader:
+    """Runs named loaders on worker threads; get() only waits for the one it needs."""
+
+    def __init__(self, max_workers: int = 8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+        self._futures = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+
+    def start(self, name: str, loader):
+        def timed():
+            start_time = time.perf_counter()
+            try:
+                return loader()
+            finally:
+                with self._lock:
+                    self._timings[name] = time.perf_counter() - start_time
+
+        with self._lock:
+            if name not in self._futures:
+                self._futures[name] = self._executor.submit(timed)
+        return self._futures[name]
+
+    def get(self, name: str):
+        """Blocks until the named resource is loaded, re-raising its loader's error."""
+        return self._futures[name].result()
+
+    def get_if_ready(self, name: str):
+        future = self._futures.get(name)
+        if future is None or not future.done() or future.exception():
+            return None
+        return future.result()
+
+    def wait_all(self) -> float:
+        """Waits for every loader, returns seconds since the loader was created."""
+        for future in list(self._futures.values()):
+            future.exception()
+        return time.perf_counter() - self.started_at
+
+    def errors(self) -> dict:
+        """Loaders that failed, by name."""
+        return {name: repr(future.exception()) for name, future in self._futures.items()
+                if future.done() and future.exception()}
+
+    def status(self) -> dict:
+        """"loading", "ready" or "failed" for every loader."""
+        return {name: "loading" if not future.done() else "failed" if future.exception() else "ready"
+                for name, future in list(self._futures.items())}
+
+    def timings(self) -> dict:
+        with self._lock:
+            return dict(self._timings)
+
+def load_whisper(model: str = WHISPER_MODEL):
+    """The ASR engine WHISPER_MODEL selects (see asr.ENGINES), warmed up."""
+    from asr import load_engine
+
+    engine = load_engine(model)
+    # The first inference pays for allocations and kernel selection, do it before the first utterance
+    engine.transcribe(np.zeros(RATE, dtype=np.float32))
+    return engine
+
+def load_audio():
+    """PyAudio, whose creation scans every audio device."""
+    import pyaudio
+
+    pa = pyaudio.PyAudio()
+    if DEBUG_AUDIO_DEVICES:
+        for i in range(pa.get_device_count()):
+            device_info = pa.get_device_info_by_index(i)
+            print(f"Device {i}: {device_info['name']} (Input: {device_info['maxInputChannels']}, Output: {device_info['maxOutputChannels']})")
+    return pa
+
+def load_porcupine():
+    import pvporcupine
+
+    return pvporcupine.create(access_key=PORCUPINE_ACCESS_KEY, keyword_paths=[PORCUPINE_WAKE_WORD])
+
+def warm_up_language_id():
+    from language import get_identifier
+
+    # langid's model takes about a second to load, keep that out of the first turn
+    get_identifier()
+
+def preload_agents():
+    from agents.agent_manager import preload_agents
+
+    preload_agents()
+
+def start_voice_loading() -> BackgroundLoader:
+    """Starts loading everything the voice entry point needs, in parallel."""
+    loader = BackgroundLoader()
+    loader.start("whisper", load_whisper)
+    loader.start("porcupine", load_porcupine)
+    loader.start("audio", load_audio)
+    loader.start("langid", warm_up_language_id)
+    loader.start("agents", preload_agents)
+    return loader
+
+def start_server_loading() -> BackgroundLoader:
+    """Starts loading what the server shares between clients: no wake word or microphone."""
+    loader = BackgroundLoader()
+    loader.start("whisper", load_whisper)
+    loader.start("langid", warm_up_language_id)
+    loader.start("agents", preload_agents)
+    return loader
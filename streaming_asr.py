@@ -0,0 +1,133 @@
+import re
+import threading
+from audio_buffer import UtteranceBuffer
+
+def normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+class StreamingTranscriber:
+    """Transcribes an utterance while it is still being spoken, committing stable prefixes.
+
+    Every `interval` seconds the uncommitted audio is re-transcribed with word
+    timestamps. Words on which two consecutive hypotheses agree are committed
+    (LocalAgreement-2) and the audio behind them is dropped from later passes,
+    with the committed text passed as the prompt. When the endpoint fires only
+    the uncommitted tail is left to decode, or nothing when the latest pass already
+    covered all the audio. nudge() runs a pass right away, e.g. when the speaker
+    pauses, so the endpointer gets a current partial transcript.
+
+    `transcribe_words(audio, prompt)` must return [(start, end, word), ...] with
+    times in seconds relative to the start of `audio`.
+    """
+
+    def __init__(self, transcribe_words, rate: int = 16000, interval: float = 1.0, min_seconds: float = 1.0, on_partial=None):
+        self.transcribe_words = transcribe_words
+        self.rate = rate
+        self.interval = interval
+        self.min_samples = int(min_seconds * rate)
+        self.on_partial = on_partial
+
+        self.buffer = UtteranceBuffer(rate=rate)
+        self.committed = []
+        self.hypothesis = []
+        self.offset = 0
+        # Samples of the buffer the latest hypothesis covers
+        self.transcribed = 0
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._nudged = threading.Event()
+        self._passing = False
+        self._worker = threading.Thread(target=self._run, name="streaming-asr", daemon=True)
+        self._worker.start()
+
+    def feed(self, chunk: bytes):
+        with self._lock:
+            self.buffer.append(chunk)
+
+    def committed_text(self) -> str:
+        return "".join(word for _, _, word in self.committed).strip()
+
+    def partial_text(self) -> str:
+        """Committed words plus the latest unconfirmed hypothesis."""
+        return "".join(word for _, _, word in self.committed + self.hypothesis).strip()
+
+    def current_text(self) -> str:
+        """partial_text() if it covers all the audio fed so far, otherwise empty."""
+        with self._lock:
+            if self.transcribed < len(self.buffer):
+                return ""
+        return self.partial_text()
+
+    def nudge(self) -> bool:
+        """Runs the next pass now instead of at the next interval.
+
+        Skipped while a pass is running or when less than min_seconds of audio is
+        uncommitted: a pass over a long window, or one finish() has to wait for,
+        would delay the final transcript rather than speed it up.
+        """
+        with self._lock:
+            if self._passing or len(self.buffer) - self.offset < self.min_samples:
+                return False
+        self._nudged.set()
+        return True
+
+    def _window(self):
+        """Copy of the uncommitted audio and its offset, taken under the lock."""
+        with self._lock:
+            return self.buffer.to_float32()[self.offset:].copy(), self.offset
+
+    def _run(self):
+        while True:
+            self._nudged.wait(self.interval)
+            self._nudged.clear()
+            if self._finished.is_set():
+                break
+
+            with self._lock:
+                # Nothing new since the last pass, or too little uncommitted audio to be worth it
+                if len(self.buffer) == self.transcribed or len(self.buffer) - self.offset < self.min_samples:
+                    continue
+                audio, offset = self.buffer.to_float32()[self.offset:].copy(), self.offset
+                transcribed_until = len(self.buffer)
+                self._passing = True
+            shift = offset / self.rate
+            try:
+                words = [(start + shift, end + shift, word) for start, end, word in self.transcribe_words(audio, self.committed_text())]
+            except Exception as e:
+                # One failed pass must not end the partials, the next one may succeed
+                print(f"❌ Streaming transcription pass failed: {e}")
+                continue
+            finally:
+                with self._lock:
+                    self._passing = False
+
+            # Commit the longest prefix both hypotheses agree on
+            agreed = 0
+            while (agreed < len(words) and agreed < len(self.hypothesis)
+                   and normalize_word(words[agreed][2]) == normalize_word(self.hypothesis[agreed][2])):
+                agreed += 1
+
+            if agreed:
+                self.committed.extend(words[:agreed])
+                with self._lock:
+                    self.offset = max(self.offset, min(int(words[agreed - 1][1] * self.rate), len(self.buffer)))
+            self.hypothesis = words[agreed:]
+            with self._lock:
+                self.transcribed = transcribed_until
+
+            if self.on_partial:
+                self.on_partial(self.partial_text())
+
+    def finish(self) -> str:
+        """Stops background passes and decodes only the uncommitted tail."""
+        self._finished.set()
+        self._nudged.set()
+        self._worker.join()
+
+        # The latest pass decoded exactly the audio that is still uncommitted
+        if self.transcribed == len(self.buffer):
+            return self.partial_text()
+
+        audio, _ = self._window()
+        tail = self.transcribe_words(audio, self.committed_text()) if len(audio) else []
+        return "".join(word for _, _, word in self.committed + tail).strip()
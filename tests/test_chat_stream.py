@@ -0,0 +1,93 @@
+"""Streaming chat against the mock AnythingLLM server: SSE parsing and sentence splitting.
+
+Usage: python -m unittest discover tests
+"""
+import os
+import sys
+import time
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from mock_servers import MockDelays, MockServer
+
+mock = MockServer(delays=MockDelays(chat=0.0, token=0.0)).start()
+os.environ.update({
+    "ANYTHING_LLM_API_URL": f"{mock.url}/api",
+    "ANYTHING_LLM_CHAT_WORKSPACE": "chat",
+    "CHAT_MEMORY_TOKENS": "0",
+    "MIN_SENTENCE_CHARS": "20",
+})
+
+from chat import split_sentences, stream_command_to_ai
+
+RESPONSE = "Sure, here is the first sentence. 这是第二句话。 The third one ends here! Ok"
+SENTENCES = ["Sure, here is the first sentence.", "这是第二句话。 The third one ends here!", "Ok"]
+
+def tearDownModule():
+    mock.stop()
+
+class SplitSentencesTest(unittest.TestCase):
+    def test_tokens_cut_mid_word(self):
+        tokens = ["Hello the", "re, this is sentence one. An", "d two follows here! ", "Bye"]
+        self.assertEqual(list(split_sentences(tokens)), ["Hello there, this is sentence one.", "And two follows here!", "Bye"])
+
+    def test_short_sentence_joins_the_next(self):
+        self.assertEqual(list(split_sentences(["Yes. ", "That is the whole answer. "])), ["Yes. That is the whole answer."])
+
+    def test_decimal_point_is_not_an_end(self):
+        self.assertEqual(list(split_sentences(["Pi is about 3.14 and that is enough. "])), ["Pi is about 3.14 and that is enough."])
+
+class StreamCommandTest(unittest.TestCase):
+    def setUp(self):
+        mock.chat_response = RESPONSE
+
+    def tearDown(self):
+        mock.stream_chunk_bytes = None
+
+    def stream(self):
+        completed = threading.Event()
+        tokens = list(stream_command_to_ai("Tell me three things.", completed))
+        return tokens, completed
+
+    def test_one_event_per_chunk(self):
+        tokens, completed = self.stream()
+        self.assertEqual("".join(tokens), RESPONSE)
+        self.assertTrue(completed.is_set())
+
+    def test_chunks_cut_through_data_lines_and_characters(self):
+        # 7 bytes cuts "data:" prefixes, JSON and the 3-byte UTF-8 characters apart
+        for size in (1, 7, 64):
+            with self.subTest(size=size):
+                mock.stream_chunk_bytes = size
+                tokens, completed = self.stream()
+                self.assertEqual("".join(tokens), RESPONSE)
+                self.assertTrue(completed.is_set())
+
+    def test_done_ends_the_stream(self):
+        # The server keeps the body open after [DONE], the client must not wait for it
+        mock.delays.after_done = 2.0
+        try:
+            start_time = time.perf_counter()
+            tokens, completed = self.stream()
+            self.assertLess(time.perf_counter() - start_time, 1.0)
+        finally:
+            mock.delays.after_done = 0.0
+        self.assertEqual("".join(tokens), RESPONSE)
+        self.assertTrue(completed.is_set())
+
+    def test_empty_response(self):
+        mock.chat_response = ""
+        tokens, completed = self.stream()
+        self.assertEqual(tokens, [])
+        self.assertTrue(completed.is_set())
+
+    def test_sentences_from_the_stream(self):
+        mock.stream_chunk_bytes = 5
+        self.assertEqual(list(split_sentences(stream_command_to_ai("Tell me three things."))), SENTENCES)
+
+if __name__ == "__main__":
+    unittest.main()
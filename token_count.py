@@ -0,0 +1,8 @@
+import re
+
+CJK_CHAR = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a tokenizer: about 4 characters per token, 1 per CJK character."""
+    cjk = len(CJK_CHAR.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "false").lower() == "true"
+TRACE_JSONL = os.getenv("TRACE_JSONL", "traces/turns.jsonl")
+TRACE_PROMETHEUS = os.getenv("TRACE_PROMETHEUS", "traces/jasmine.prom")
+# Turns kept per histogram for the rolling percentiles
+TRACE_WINDOW = int(os.getenv("TRACE_WINDOW", "1000"))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Latencies derived from marks: name -> (from mark, to mark)
+DERIVED_LATENCIES = {
+    "wake_to_speech": ("wake", "speech_start"),
+    "endpointing": ("last_speech", "endpoint"),
+    "endpoint_to_first_token": ("endpoint", "first_token"),
+    "endpoint_to_first_audio": ("endpoint", "first_audio"),
+}
+
+_turn_ids = itertools.count(1)
+
+class RollingHistogram:
+    """Keeps the last `window` observations for percentiles, and all-time count and sum."""
+
+    def __init__(self, window: int = TRACE_WINDOW):
+        self.values = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        if not self.values:
+            return 0.0
+        ordered = sorted(self.values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class TurnTrace:
+    """Timestamps and stage durations of one turn, relative to when it started."""
+    enabled = True
+
+    def __init__(self, source: str):
+        self.turn_id = next(_turn_ids)
+        self.source = source
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.marks = {}
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str, at: float = None):
+        """Records when `name` happened (perf_counter time, default now); the first mark wins."""
+        offset = (time.perf_counter() if at is None else at) - self._t0
+        with self._lock:
+            self.marks.setdefault(name, offset)
+
+    def add_span(self, name: str, seconds: float):
+        """Adds to a stage's duration, stages such as TTS run once per sentence."""
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    @contextmanager
+    def span(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_span(name, time.perf_counter() - start_time)
+
+    def latencies(self) -> dict:
+        latencies = dict(self.spans)
+        for name, (start, end) in DERIVED_LATENCIES.items():
+            if start in self.marks and end in self.marks:
+                latencies[name] = self.marks[end] - self.marks[start]
+        return latencies
+
+    def finish(self):
+        self.mark("finished")
+        recorder.record(self)
+
+class NullTrace:
+    """Stands in for a trace when tracing is disabled, every call is a no-op."""
+    enabled = False
+    _span = nullcontext()
+
+    def mark(self, name: str, at: float = None):
+        pass
+
+    def add_span(self, name: str, seconds: float):
+        pass
+
+    def span(self, name: str):
+        return self._span
+
+    def finish(self):
+        pass
+
+NULL_TRACE = NullTrace()
+
+_current = contextvars.ContextVar("turn_trace", default=NULL_TRACE)
+
+class TraceRecorder:
+    """Feeds finished turns into rolling histograms and dumps them as JSONL and Prometheus text."""
+
+    def __init__(self, jsonl_path: str = TRACE_JSONL, prometheus_path: str = TRACE_PROMETHEUS):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace: TurnTrace):
+        latencies = trace.latencies()
+        line = json.dumps({
+            "turn_id": trace.turn_id,
+            "source": trace.source,
+            "started_at": trace.started_at,
+            "marks": trace.marks,
+            "latencies": latencies,
+        })
+
+        with self._lock:
+            for name, seconds in latencies.items():
+                self.histograms.setdefault(name, RollingHistogram()).observe(seconds)
+            try:
+                if self.jsonl_path:
+                    os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+                    with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                        f.write(line + "\n")
+                if self.prometheus_path:
+                    self.write_prometheus()
+            except OSError as e:
+                print(f"❌ Failed to write trace: {e}")
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {name: {**{f"p{int(q * 100)}": histogram.quantile(q) for q in QUANTILES}, "count": histogram.count}
+                    for name, histogram in self.histograms.items()}
+
+    def write_prometheus(self):
+        lines = [
+            "# HELP jasmine_stage_seconds Per-turn latency of each pipeline stage.",
+            "# TYPE jasmine_stage_seconds summary",
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            for q in QUANTILES:
+                lines.append(f'jasmine_stage_seconds{{stage="{name}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+            lines.append(f'jasmine_stage_seconds_sum{{stage="{name}"}} {histogram.total:.6f}')
+            lines.append(f'jasmine_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+
+        os.makedirs(os.path.dirname(self.prometheus_path) or ".", exist_ok=True)
+        tmp_path = f"{self.prometheus_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        # Atomic, so a scraper never reads a half written file
+        os.replace(tmp_path, self.prometheus_path)
+
+recorder = TraceRecorder()
+
+def start_turn(source: str = "voice"):
+    """A new trace for one turn, or the shared no-op trace when tracing is disabled."""
+    return TurnTrace(source) if TRACE_ENABLED else NULL_TRACE
+
+def current():
+    return _current.get()
+
+@contextmanager
+def activate(trace):
+    """Makes `trace` the current one for span()/mark() calls in this thread or task."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+def span(name: str):
+    return _current.get().span(name)
+
+def mark(name: str):
+    _current.get().mark(name)
+
+def get_latency_summary() -> dict:
+    """Rolling p50/p95/p99 and count of every recorded stage."""
+    return recorder.summary()
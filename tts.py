@@ -0,0 +1,219 @@
+import io
+import os
+import wave
+import importlib.util
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from cache import LRUCache
+
+load_dotenv()
+
+# "piper" runs fully offline, "gtts" calls Google Text-to-Speech, "auto" picks piper when it is installed with its voices
+TTS_ENGINE = os.getenv("TTS_ENGINE", "auto").lower()
+# Comma separated lang=model pairs, e.g. "en=voices/en_US-amy-medium.onnx,zh-cn=voices/zh_CN-huayan-medium.onnx"
+PIPER_VOICES = os.getenv("PIPER_VOICES", "")
+TTS_CACHE_SIZE = int(os.getenv("TTS_CACHE_SIZE", "128"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".cache/tts")
+# Disk cache size, the least recently played phrases are deleted beyond it (0 disables the disk cache)
+TTS_CACHE_DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", "100"))
+
+@dataclass(frozen=True)
+class Speech:
+    """Synthesized 16-bit mono PCM."""
+    pcm: bytes
+    rate: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / 2 / self.rate
+
+class TTSEngine(ABC):
+    """A text-to-speech backend producing PCM for a language code."""
+    name = "base"
+
+    def voice_for(self, lang: str) -> str:
+        return lang
+
+    @abstractmethod
+    def synthesize(self, text: str, lang: str) -> Speech:
+        pass
+
+class GTTSEngine(TTSEngine):
+    """Google Text-to-Speech, needs network; the MP3 is decoded in memory."""
+    name = "gtts"
+
+    def synthesize(self, text: str, lang: str) -> Speech:
+        from gtts import gTTS
+        from pydub import AudioSegment
+
+        mp3 = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=False).write_to_fp(mp3)
+        mp3.seek(0)
+        audio = AudioSegment.from_file(mp3, format="mp3").set_channels(1).set_sample_width(2)
+        return Speech(audio.raw_data, audio.frame_rate)
+
+class PiperEngine(TTSEngine):
+    """Offline neural TTS (piper-tts), one ONNX voice per language, loaded on first use."""
+    name = "piper"
+
+    def __init__(self, voices: str = PIPER_VOICES):
+        self.voice_paths = dict(pair.split("=", 1) for pair in voices.split(",") if "=" in pair)
+        self._voices = {}
+        self._lock = threading.Lock()
+
+    def voice_for(self, lang: str) -> str:
+        path = self.voice_paths.get(lang) or self.voice_paths.get(lang.split("-")[0])
+        if path is None:
+            raise ValueError(f"No Piper voice configured for '{lang}', check PIPER_VOICES")
+        return path
+
+    def load_voice(self, path: str):
+        with self._lock:
+            if path not in self._voices:
+                from piper import PiperVoice
+                self._voices[path] = PiperVoice.load(path)
+            return self._voices[path]
+
+    def synthesize(self, text: str, lang: str) -> Speech:
+        voice = self.load_voice(self.voice_for(lang))
+        chunks = list(voice.synthesize(text))
+        rate = chunks[0].sample_rate if chunks else voice.config.sample_rate
+        return Speech(b"".join(chunk.audio_int16_bytes for chunk in chunks), rate)
+
+ENGINES = {
+    "gtts": GTTSEngine,
+    "piper": PiperEngine,
+}
+
+def piper_available(voices: str = PIPER_VOICES) -> bool:
+    """piper-tts is installed and every voice in PIPER_VOICES exists."""
+    paths = [pair.split("=", 1)[1] for pair in voices.split(",") if "=" in pair]
+    return bool(paths) and all(map(os.path.exists, paths)) and importlib.util.find_spec("piper") is not None
+
+def create_engine(name: str = TTS_ENGINE) -> TTSEngine:
+    if name == "auto":
+        name = "piper" if piper_available() else "gtts"
+    if name not in ENGINES:
+        raise ValueError(f"Unknown TTS_ENGINE '{name}', expected auto or one of {', '.join(ENGINES)}")
+    return ENGINES[name]()
+
+class CachedTTS:
+    """Content-addressed synthesis cache: LRU in memory, WAV files on disk.
+
+    Keyed by (engine, voice, language, text), so a repeated phrase such as
+    "Lights are ON now." plays back without any synthesis. Every chat sentence
+    is new, so the disk cache is capped at disk_mb: reading a file touches its
+    mtime, and the files with the oldest mtimes are deleted beyond the cap.
+    """
+
+    def __init__(self, engine: TTSEngine, cache_dir: str = TTS_CACHE_DIR, cache_size: int = TTS_CACHE_SIZE,
+                 disk_mb: float = TTS_CACHE_DISK_MB):
+        self.engine = engine
+        self.cache_dir = cache_dir
+        self.memory = LRUCache(maxsize=cache_size)
+        self.disk_limit = int(disk_mb * 1024 * 1024)
+        # Bytes under cache_dir, counted on the first write
+        self.disk_bytes = None
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self.syntheses = 0
+        self._disk_lock = threading.Lock()
+
+    def key(self, text: str, lang: str) -> str:
+        identity = "\0".join((self.engine.name, self.engine.voice_for(lang), lang, text))
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.wav")
+
+    def read_disk(self, key: str):
+        if not self.disk_limit:
+            return None
+        try:
+            with wave.open(self.path(key), "rb") as wf:
+                speech = Speech(wf.readframes(wf.getnframes()), wf.getframerate())
+            os.utime(self.path(key))
+            return speech
+        except (FileNotFoundError, wave.Error, EOFError):
+            return None
+
+    def disk_files(self) -> list:
+        """(mtime, size, path) of every cached WAV."""
+        files = []
+        for directory, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".wav"):
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def evict_disk(self):
+        """Deletes the least recently used files until the cache is a tenth under its cap."""
+        files = sorted(self.disk_files())
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.disk_bytes <= self.disk_limit * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.disk_bytes -= size
+            self.disk_evictions += 1
+
+    def write_disk(self, key: str, speech: Speech):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with wave.open(tmp_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(speech.rate)
+            wf.writeframes(speech.pcm)
+        # Atomic, a concurrent reader never sees a half written file
+        os.replace(tmp_path, path)
+
+        with self._disk_lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(size for _, size, _ in self.disk_files())
+            else:
+                self.disk_bytes += os.path.getsize(path)
+            if self.disk_bytes > self.disk_limit:
+                self.evict_disk()
+
+    def synthesize(self, text: str, lang: str) -> Speech:
+        key = self.key(text, lang)
+        speech = self.memory.get(key)
+        if speech is not None:
+            return speech
+
+        speech = self.read_disk(key)
+        if speech is not None:
+            self.disk_hits += 1
+        else:
+            speech = self.engine.synthesize(text, lang)
+            self.syntheses += 1
+            try:
+                if self.disk_limit:
+                    self.write_disk(key, speech)
+            except OSError as e:
+                print(f"❌ Failed to cache speech: {e}")
+
+        self.memory.set(key, speech)
+        return speech
+
+    def stats(self) -> dict:
+        return {"memory": self.memory.stats(), "disk_hits": self.disk_hits, "disk_bytes": self.disk_bytes,
+                "disk_evictions": self.disk_evictions, "syntheses": self.syntheses}
+
+tts = CachedTTS(create_engine())
+
+def synthesize(text: str, lang: str) -> Speech:
+    return tts.synthesize(text, lang)
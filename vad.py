@@ -0,0 +1,49 @@
+import numpy as np
+import webrtcvad
+from scipy.signal import butter, sosfilt
+
+class VadFrontEnd:
+    """Band-pass filters the capture stream and runs webrtcvad over every subframe of it.
+
+    The filter is designed once as second-order sections, and its state is carried
+    from chunk to chunk, so there are no transients at chunk edges. Samples that do
+    not fill a whole VAD subframe are kept for the next chunk.
+    """
+
+    def __init__(self, rate: int = 16000, mode: int = 2, frame_ms: int = 10,
+                 lowcut: float = 300.0, highcut: float = 3400.0, order: int = 6):
+        if frame_ms not in (10, 20, 30):
+            raise ValueError(f"webrtcvad only accepts 10, 20 or 30 ms frames, got {frame_ms}")
+
+        self.rate = rate
+        self.frame_length = rate * frame_ms // 1000
+        self.sos = butter(order, [lowcut, highcut], btype="band", fs=rate, output="sos")
+        self.vad = webrtcvad.Vad(mode)
+        self.reset()
+
+    def reset(self):
+        """Forgets filter state and leftover samples, e.g. when the stream restarts."""
+        self.zi = np.zeros((self.sos.shape[0], 2))
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.last_votes = np.zeros(0, dtype=bool)
+        self.last_decision = False
+
+    def filter(self, pcm: np.ndarray) -> np.ndarray:
+        filtered, self.zi = sosfilt(self.sos, pcm, zi=self.zi)
+        return np.clip(filtered, -32768, 32767).astype(np.int16)
+
+    def is_speech(self, frame: bytes) -> bool:
+        """Majority vote of the subframes completed by this chunk, ties count as speech."""
+        samples = np.concatenate((self.pending, self.filter(np.frombuffer(frame, dtype=np.int16))))
+
+        count = len(samples) // self.frame_length
+        self.pending = samples[count * self.frame_length:]
+        if count == 0:
+            return self.last_decision
+
+        subframes = samples[:count * self.frame_length].reshape(count, self.frame_length)
+        self.last_votes = np.fromiter(
+            (self.vad.is_speech(subframe.tobytes(), self.rate) for subframe in subframes),
+            dtype=bool, count=count)
+        self.last_decision = bool(np.count_nonzero(self.last_votes) * 2 >= count)
+        return self.last_decision
@@ -0,0 +1,210 @@
+import os
+import re
+import json
+import time
+import codecs
+import hashlib
+import threading
+import requests
+import http_client
+from html.parser import HTMLParser
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Hard caps per fetch: bytes downloaded and seconds spent downloading
+WEB_MAX_BYTES = int(os.getenv("WEB_MAX_BYTES", "2000000"))
+WEB_FETCH_TIMEOUT = float(os.getenv("WEB_FETCH_TIMEOUT", "10"))
+# Visible text collected before the download is stopped
+WEB_MAX_TEXT_CHARS = int(os.getenv("WEB_MAX_TEXT_CHARS", "5000"))
+WEB_CACHE_DIR = os.getenv("WEB_CACHE_DIR", ".cache/web")
+# Seconds extracted text stays fresh when the page sends no Cache-Control max-age
+WEB_CACHE_TTL = int(os.getenv("WEB_CACHE_TTL", "3600"))
+
+# A read cut short by the time cap loses what it had received, so reads are kept small
+CHUNK_SIZE = 4096
+
+# Their content is never visible text
+SKIPPED_TAGS = {"script", "style", "noscript", "template"}
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+CHARSET = re.compile(r"charset=([\w-]+)", re.IGNORECASE)
+
+class TextExtractor(HTMLParser):
+    """Collects the visible words of an HTML document as it is fed, without building a DOM."""
+
+    def __init__(self, max_chars: int = WEB_MAX_TEXT_CHARS):
+        super().__init__()
+        self.max_chars = max_chars
+        self.words = []
+        self.chars = 0
+        self.skip_depth = 0
+
+    @property
+    def done(self) -> bool:
+        return self.chars >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if self.skip_depth or self.done:
+            return
+        for word in data.split():
+            self.words.append(word)
+            self.chars += len(word) + 1
+
+    def text(self) -> str:
+        return " ".join(self.words)[:self.max_chars]
+
+class PageCache:
+    """Extracted page text on disk, one JSON file per URL, with the validators to revalidate it."""
+
+    def __init__(self, cache_dir: str = WEB_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def read(self, url: str):
+        try:
+            with open(self.path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def write(self, url: str, entry: dict):
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        # Atomic, a concurrent reader never sees a half written file
+        os.replace(tmp_path, path)
+
+page_cache = PageCache()
+
+def cache_ttl(response: requests.Response):
+    """Seconds the page may be reused for, None when it must not be stored."""
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    match = MAX_AGE.search(cache_control)
+    return int(match.group(1)) if match else WEB_CACHE_TTL
+
+def stream_text(response: requests.Response, max_chars: int, max_bytes: int):
+    """Feeds the body to the extractor chunk by chunk, returns (text, complete).
+
+    The time cap is enforced by aborting the response (see fetch_text), which ends the body early.
+    """
+    match = CHARSET.search(response.headers.get("Content-Type", ""))
+    try:
+        decoder = codecs.getincrementaldecoder(match.group(1) if match else "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    extractor = TextExtractor(max_chars)
+    received = 0
+    complete = True
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            received += len(chunk)
+            extractor.feed(decoder.decode(chunk))
+            # Enough text: stop downloading, the rest of the page would be thrown away anyway
+            if extractor.done:
+                break
+            if received >= max_bytes:
+                complete = False
+                break
+    except requests.exceptions.RequestException:
+        if not getattr(response, "aborted", False):
+            raise
+    if getattr(response, "aborted", False):
+        complete = extractor.done
+    if not complete:
+        print(f"⚠️ Page cut off after {received} bytes: {response.url}")
+    extractor.close()
+    return extractor.text(), complete
+
+def fetch_text(url: str, max_chars: int = WEB_MAX_TEXT_CHARS, max_bytes: int = WEB_MAX_BYTES,
+               timeout: float = WEB_FETCH_TIMEOUT) -> str:
+    """Visible text of a web page, at most max_chars, from the cache when it is still fresh.
+
+    Returns None when the page can't be fetched.
+    """
+    cached = page_cache.read(url)
+    # An entry cut at fewer characters than wanted can't answer this request
+    if cached and cached["max_chars"] < max_chars and len(cached["text"]) >= cached["max_chars"]:
+        cached = None
+    if cached and time.time() < cached["expires_at"]:
+        return cached["text"][:max_chars]
+
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    deadline = time.monotonic() + timeout
+    try:
+        response = http_client.get(url, headers=headers, stream=True, timeout=(http_client.HTTP_CONNECT_TIMEOUT, timeout))
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Failed to fetch {url}: {e}")
+        return None
+
+    with response:
+        ttl = cache_ttl(response)
+
+        # Not modified: the cached text is still valid, only its lifetime is renewed
+        if response.status_code == 304 and cached:
+            if ttl is not None:
+                cached["expires_at"] = time.time() + ttl
+                try:
+                    page_cache.write(url, cached)
+                except OSError as e:
+                    print(f"❌ Failed to cache page: {e}")
+            return cached["text"][:max_chars]
+
+        if response.status_code != 200:
+            print(f"❌ Failed to fetch {url}: {response.status_code}")
+            return None
+
+        content_type = response.headers.get("Content-Type", "text/html")
+        if not any(kind in content_type for kind in ("html", "text", "xml")):
+            print(f"❌ Not a web page ({content_type}): {url}")
+            return None
+
+        # A slow server can trickle bytes that each arrive within the read timeout, so the
+        # remaining time is enforced by ending the response when it runs out
+        timer = threading.Timer(max(0.0, deadline - time.monotonic()), http_client.abort, [response])
+        timer.daemon = True
+        timer.start()
+        try:
+            text, complete = stream_text(response, max_chars, max_bytes)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Failed to fetch {url}: {e}")
+            return None
+        finally:
+            timer.cancel()
+
+    # A page cut off by the byte or time cap is used once but not cached
+    if complete and ttl is not None:
+        try:
+            page_cache.write(url, {
+                "url": url,
+                "text": text,
+                "max_chars": max_chars,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "expires_at": time.time() + ttl,
+            })
+        except OSError as e:
+            print(f"❌ Failed to cache page: {e}")
+
+    return text